@@ -0,0 +1,289 @@
+import datetime
+import json
+import logging
+import mmap
+import os
+from array import array
+from message_types import TIMESTAMP, SYSTEM, TEXT, Message
+from timestamps import from_epoch, to_epoch
+
+# 列式存档中消息类型的编码
+KINDS = (TIMESTAMP, SYSTEM, TEXT)
+KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+NO_SENDER = -1
+
+# 列式存档的列文件：(文件名, array 类型码)
+COLUMNS = {
+    "ts": ("ts.i64", 'q'),
+    "kind": ("kind.u8", 'B'),
+    "sender": ("sender.i32", 'i'),
+    "index": ("index.i32", 'i'),
+    "content_end": ("content_end.i64", 'q'),
+}
+CONTENT_FILE = "content.bin"
+SENDERS_FILE = "senders.jsonl"
+
+def message_to_dict(message):
+    """把 Message 转为 JSONL 记录"""
+    return {
+        "ts": message.timestamp.strftime("%Y-%m-%d %H:%M:%S") if message.timestamp else None,
+        "sender": message.sender,
+        "kind": message.kind,
+        "content": message.content,
+        "index": message.index,
+    }
+
+def message_from_dict(data):
+    """从 JSONL 记录还原 Message"""
+    ts = data.get("ts")
+    timestamp = datetime.datetime.strptime(ts, "%Y-%m-%d %H:%M:%S") if ts else None
+    return Message(data["kind"], data["content"], timestamp, data.get("sender"), data.get("index"))
+
+class JsonlArchiveWriter:
+    """追加写入 JSONL 存档，每行一条消息"""
+
+    def __init__(self, path, flush_every=500):
+        self.path = path
+        self.flush_every = max(1, flush_every)
+        self.count = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def write_message(self, message):
+        self._file.write(json.dumps(message_to_dict(message), ensure_ascii=False) + "\n")
+        self.count += 1
+        if self.count % self.flush_every == 0:
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+def iter_jsonl(path):
+    """流式读取 JSONL 存档，跳过中断写入留下的不完整行"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield message_from_dict(json.loads(line))
+            except ValueError:
+                logging.warning(f"Skipping malformed archive line {line_number} in {path}")
+
+class ColumnarArchiveWriter:
+    """追加写入列式存档目录
+
+    每列一个定长数组文件（时间为纪元秒 int64，类型为 uint8，发言者为字典编码 int32），
+    内容拼接存放在 content.bin 中，content_end 记录每条内容的结束偏移。
+    每次刷新时最后写入 content_end，中途中断最多丢失未刷新的记录，读取时以最短的列为准。
+    """
+
+    def __init__(self, directory, flush_every=1000):
+        self.directory = directory
+        self.flush_every = max(1, flush_every)
+        self.count = 0
+        os.makedirs(directory, exist_ok=True)
+
+        self._sender_codes = {}
+        senders_path = os.path.join(directory, SENDERS_FILE)
+        if os.path.exists(senders_path):
+            with open(senders_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        self._sender_codes[json.loads(line)] = len(self._sender_codes)
+
+        self._content_end = self._repair()
+        self._reset_buffers()
+
+    def _repair(self):
+        """把各列截断到最短列的长度，丢弃上次中断留下的半批数据，返回内容的结束偏移"""
+        sizes = {}
+        for name, (filename, typecode) in COLUMNS.items():
+            path = os.path.join(self.directory, filename)
+            sizes[name] = (os.path.getsize(path) if os.path.exists(path) else 0) // array(typecode).itemsize
+        length = min(sizes.values())
+
+        content_end = 0
+        if length:
+            filename, typecode = COLUMNS["content_end"]
+            with open(os.path.join(self.directory, filename), 'rb') as f:
+                f.seek((length - 1) * array(typecode).itemsize)
+                last = array(typecode)
+                last.fromfile(f, 1)
+                content_end = last[0]
+
+        for name, (filename, typecode) in COLUMNS.items():
+            path = os.path.join(self.directory, filename)
+            if sizes[name] != length or (os.path.exists(path) and os.path.getsize(path) % array(typecode).itemsize):
+                with open(path, 'ab') as f:
+                    f.truncate(length * array(typecode).itemsize)
+        content_path = os.path.join(self.directory, CONTENT_FILE)
+        if os.path.exists(content_path) and os.path.getsize(content_path) != content_end:
+            with open(content_path, 'ab') as f:
+                f.truncate(content_end)
+        return content_end
+
+    def _reset_buffers(self):
+        self._columns = {name: array(typecode) for name, (_, typecode) in COLUMNS.items()}
+        self._content = bytearray()
+        self._new_senders = []
+
+    def write_message(self, message):
+        sender_code = NO_SENDER
+        if message.sender is not None:
+            sender_code = self._sender_codes.get(message.sender)
+            if sender_code is None:
+                sender_code = len(self._sender_codes)
+                self._sender_codes[message.sender] = sender_code
+                self._new_senders.append(message.sender)
+
+        encoded = message.content.encode('utf-8')
+        self._content += encoded
+        self._content_end += len(encoded)
+
+        columns = self._columns
+        columns["ts"].append(to_epoch(message.timestamp))
+        columns["kind"].append(KIND_CODES[message.kind])
+        columns["sender"].append(sender_code)
+        columns["index"].append(-1 if message.index is None else message.index)
+        columns["content_end"].append(self._content_end)
+
+        self.count += 1
+        if self.count % self.flush_every == 0:
+            self.flush()
+
+    def flush(self):
+        """把缓冲的记录追加到各列文件"""
+        if not self._columns["content_end"]:
+            return
+        if self._new_senders:
+            with open(os.path.join(self.directory, SENDERS_FILE), 'a', encoding='utf-8') as f:
+                f.writelines(json.dumps(sender, ensure_ascii=False) + "\n" for sender in self._new_senders)
+        with open(os.path.join(self.directory, CONTENT_FILE), 'ab') as f:
+            f.write(self._content)
+        # content_end 最后写入，作为这一批记录的提交点
+        for name, (filename, _) in COLUMNS.items():
+            with open(os.path.join(self.directory, filename), 'ab') as f:
+                self._columns[name].tofile(f)
+        self._reset_buffers()
+
+    def close(self):
+        self.flush()
+
+class ColumnarArchive:
+    """以内存映射方式读取列式存档
+
+    timestamps 等列直接暴露为 memoryview，可以不解码内容做批量的时间范围计算。
+    这些视图由存档持有，close() 时全部释放，之后不能再使用。
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._maps = []
+        self._views = []
+        self.columns = {name: self._map(filename, typecode) for name, (filename, typecode) in COLUMNS.items()}
+        self.content = self._map(CONTENT_FILE, 'B')
+        self.length = min(len(column) for column in self.columns.values())
+        self._timestamps = self._view(self.columns["ts"][:self.length])
+        self.senders = []
+        senders_path = os.path.join(directory, SENDERS_FILE)
+        if os.path.exists(senders_path):
+            with open(senders_path, 'r', encoding='utf-8') as f:
+                self.senders = [json.loads(line) for line in f if line.strip()]
+
+    def _map(self, filename, typecode):
+        path = os.path.join(self.directory, filename)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return memoryview(b'').cast(typecode)
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        usable = len(mapped) - len(mapped) % array(typecode).itemsize
+        # 中间的视图同样持有映射的导出，需要保留下来在 close() 时释放
+        base = self._view(memoryview(mapped))
+        return self._view(self._view(base[:usable]).cast(typecode))
+
+    def _view(self, view):
+        self._views.append(view)
+        return view
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def timestamps(self):
+        """纪元秒数列（NO_TIME 表示没有时间）"""
+        return self._timestamps
+
+    def message(self, i):
+        """读取第 i 条消息"""
+        columns = self.columns
+        start = columns["content_end"][i - 1] if i > 0 else 0
+        content = bytes(self.content[start:columns["content_end"][i]]).decode('utf-8')
+        sender_code = columns["sender"][i]
+        index = columns["index"][i]
+        return Message(KINDS[columns["kind"][i]], content, from_epoch(columns["ts"][i]),
+                       self.senders[sender_code] if sender_code != NO_SENDER else None,
+                       None if index < 0 else index)
+
+    def __iter__(self):
+        for i in range(self.length):
+            yield self.message(i)
+
+    def close(self):
+        # 先释放派生的视图，再释放底层视图，最后关闭映射
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        for mapped in self._maps:
+            mapped.close()
+        self._maps = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+def archive_paths(export_path, group):
+    """群聊存档的 JSONL 文件和列式目录路径"""
+    directory = os.path.join(export_path, "archive")
+    return os.path.join(directory, f"{group}.jsonl"), os.path.join(directory, f"{group}.columnar")
+
+def load_archive(path):
+    """流式读取存档中的 Message 记录，目录按列式存档读取，否则按 JSONL 读取"""
+    if os.path.isdir(path):
+        with ColumnarArchive(path) as archive:
+            yield from archive
+    else:
+        yield from iter_jsonl(path)
+
+class ArchiveWriter:
+    """把导出流水线中的消息同时写入配置的存档格式"""
+
+    def __init__(self, export_path, group, formats):
+        jsonl_path, columnar_path = archive_paths(export_path, group)
+        self.writers = []
+        if "jsonl" in formats:
+            self.writers.append(JsonlArchiveWriter(jsonl_path))
+        if "columnar" in formats:
+            self.writers.append(ColumnarArchiveWriter(columnar_path))
+
+    def tee(self, messages):
+        """写入存档后原样产出消息"""
+        writers = self.writers
+        for message in messages:
+            for writer in writers:
+                writer.write_message(message)
+            yield message
+
+    def close(self):
+        for writer in self.writers:
+            writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from waits import PhaseStats
+from worker_pool import build_messages, iter_batches
+
+def init_ui_thread():
+    """界面线程初始化 COM：UI Automation 对象只能在创建它的单元线程中使用"""
+    try:
+        import comtypes
+    except ImportError:
+        return
+    comtypes.CoInitialize()
+
+class GroupPipeline:
+    """单个群聊的后处理流水线：解析 → 筛选 → 写入
+
+    每个阶段在自己的线程中运行同步的生成器代码，阶段之间用有界的 asyncio.Queue 传递成批的数据，
+    None 表示输入结束。下游处理不过来时队列写满，上游（包括界面采集）随之暂停。
+    任一阶段失败时其余阶段尽快结束，并排空各自的输入，避免上游阻塞。
+    """
+
+    STAGES = 3
+
+    def __init__(self, queue_size):
+        self.failed = False
+        self.stats = [PhaseStats() for _ in range(self.STAGES)]
+        self.queues = [asyncio.Queue(queue_size) for _ in range(self.STAGES)]
+        self.loop = asyncio.get_running_loop()
+        self._executor = ThreadPoolExecutor(max_workers=self.STAGES, thread_name_prefix="export-stage")
+
+    def _call(self, coro):
+        """在阶段线程中等待事件循环上的队列操作"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    async def produce(self, ui, raw_items, batch_size):
+        """在界面线程中分批推进采集，放入第一个队列"""
+        outbox = self.queues[0]
+        batches = iter_batches(raw_items, batch_size)
+        try:
+            while not self.failed:
+                batch = await ui(next, batches, None)
+                if batch is None:
+                    break
+                await outbox.put(batch)
+        except Exception:
+            self.failed = True
+            raise
+        finally:
+            await outbox.put(None)
+
+    async def stage(self, index, func):
+        """运行第 index 个阶段：func(消息流) 在线程中执行
+
+        不是最后一个阶段时，func 返回生成器，产出按输入批次转发到下一个队列；最后一个阶段返回 func 的结果。
+        """
+        inbox = self.queues[index]
+        outbox = self.queues[index + 1] if index + 1 < self.STAGES else None
+        stats = self.stats[index]
+        ended = False
+
+        def inputs(pending):
+            nonlocal ended
+            while not self.failed:
+                # 取下一批输入前，先把这一批已经产出的结果交给下游
+                if pending:
+                    self._call(outbox.put(pending[:]))
+                    pending.clear()
+                start = time.perf_counter()
+                batch = self._call(inbox.get())
+                stats.add_wait(time.perf_counter() - start)
+                if batch is None:
+                    ended = True
+                    return
+                yield from batch
+
+        def run():
+            pending = []
+            if outbox is None:
+                return func(inputs(pending), stats)
+            for item in func(inputs(pending), stats):
+                pending.append(item)
+            if pending:
+                self._call(outbox.put(pending))
+
+        try:
+            return await self.loop.run_in_executor(self._executor, run)
+        except Exception:
+            self.failed = True
+            raise
+        finally:
+            if outbox is not None:
+                await outbox.put(None)
+            # 提前结束时排空输入，上游不会因队列已满而阻塞
+            while not ended:
+                ended = await inbox.get() is None
+
+    def close(self):
+        self._executor.shutdown()
+
+class AsyncExporter:
+    """基于 asyncio 的多群聊导出编排
+
+    所有界面自动化调用（连接、打开群聊、定位、采集）都在一个专用线程中执行，遵守 COM 单元的线程规则。
+    一个群聊采集完后界面线程立即处理下一个群聊，上一个群聊的解析、筛选和写入在后台继续，
+    总耗时接近只受界面限制的下限。new_export(group) 返回 wechat_exporter.GroupExport 这样的对象。
+    """
+
+    def __init__(self, session, new_export, pool=None, batch_size=200, queue_size=4):
+        self.session = session
+        self.new_export = new_export
+        self.pool = pool
+        self.batch_size = max(1, batch_size)
+        self.queue_size = max(1, queue_size)
+        self.stage_stats = []
+        self._ui_executor = None
+
+    async def ui(self, func, *args):
+        """在界面线程中执行"""
+        return await asyncio.get_running_loop().run_in_executor(self._ui_executor, func, *args)
+
+    def parse(self, raw_items, stats):
+        messages = self.pool.map_messages(raw_items) if self.pool is not None else build_messages(raw_items)
+        return stats.timed("parse", messages)
+
+    async def capture(self, pipeline, export, chat_list, ui_done):
+        """在界面线程中采集消息列表，采集结束后界面线程可以处理下一个群聊"""
+        try:
+            await pipeline.produce(self.ui, export.raw_items(chat_list, self.session.stats), self.batch_size)
+        finally:
+            ui_done.set_result(None)
+
+    async def export_group(self, group, ui_done):
+        """导出一个群聊，界面线程空闲后设置 ui_done；返回 (群名, 耗时, 条数, 错误)"""
+        start = time.perf_counter()
+        pipeline = None
+        export = None
+        try:
+            try:
+                export = self.new_export(group)
+                chat_list = await self.ui(export.prepare, self.session)
+            except Exception:
+                ui_done.set_result(None)
+                raise
+            pipeline = GroupPipeline(self.queue_size)
+            self.stage_stats.extend(pipeline.stats)
+            results = await asyncio.gather(
+                self.capture(pipeline, export, chat_list, ui_done),
+                pipeline.stage(0, self.parse),
+                pipeline.stage(1, export.select),
+                pipeline.stage(2, export.write),
+                return_exceptions=True)
+            # 所有阶段都结束后再报告第一个错误
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+            count = export.finish(pipeline.stats[-1])
+            return group, time.perf_counter() - start, count, None
+        except Exception as e:
+            logging.error(f"Error exporting group '{group}': {str(e)}")
+            return group, time.perf_counter() - start, 0, str(e)
+        finally:
+            if pipeline is not None:
+                pipeline.close()
+            if export is not None:
+                export.close()
+
+    async def run(self, groups):
+        """连接微信并依次采集每个群聊，返回每个群聊的 (群名, 耗时, 条数, 错误)"""
+        self._ui_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="wechat-ui",
+                                               initializer=init_ui_thread)
+        loop = asyncio.get_running_loop()
+        try:
+            await self.ui(self.session.connect)
+            tasks = []
+            for group in groups:
+                ui_done = loop.create_future()
+                tasks.append(asyncio.ensure_future(self.export_group(group, ui_done)))
+                await ui_done
+            return await asyncio.gather(*tasks)
+        finally:
+            self._ui_executor.shutdown()
+            for stats in self.stage_stats:
+                self.session.stats.merge(stats)
+
+    def export(self, groups):
+        return asyncio.run(self.run(groups))
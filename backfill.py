@@ -0,0 +1,183 @@
+import logging
+import math
+from collections import namedtuple
+from pywinauto.mouse import scroll
+import config
+from timestamps import classify_timestamp
+from tree_walker import TreeWalker
+
+# UIA ScrollPattern 中表示“该方向不滚动”的取值
+NO_SCROLL = -1
+
+# 一次扫描得到的消息列表时间范围：已加载项数、已加载的最早/最晚时间、可见区域的最早/最晚时间
+TimelineScan = namedtuple("TimelineScan", ["count", "oldest", "newest", "first_visible", "last_visible"])
+
+def scan_timeline(chat_list, backend=None):
+    """一次读取消息列表的直接子元素，返回已加载和可见区域的时间范围"""
+    walker = TreeWalker(backend=backend, max_depth=1)
+    count = 0
+    oldest = newest = first_visible = last_visible = None
+    top = bottom = None
+    for depth, element in walker.walk(chat_list):
+        backend = walker.backend
+        if depth == 0:
+            _, top, _, bottom = backend.rectangle(element)
+            continue
+        count += 1
+        parsed = classify_timestamp(backend.window_text(element))
+        if not parsed:
+            continue
+        if oldest is None:
+            oldest = parsed.time
+        newest = parsed.time
+        _, item_top, _, item_bottom = backend.rectangle(element)
+        if item_bottom > top and item_top < bottom:
+            if first_visible is None:
+                first_visible = parsed.time
+            last_visible = parsed.time
+    return TimelineScan(count, oldest, newest, first_visible, last_visible)
+
+class Backfill:
+    """把消息列表滚动到目标时间
+
+    先大步向上加载历史：每轮连续触发若干次“加载更早消息”（点击“查看更多消息”或跳到列表顶部），
+    每轮之后才重新读取一次时间范围，并按已观察到的每页时间跨度估算下一轮的页数，
+    没有估算依据时页数翻倍、每轮最多增长 4 倍，因此时间范围的读取次数随距离按对数增长。
+    目标时间加载进来后，再用 ScrollPattern 按滚动百分比二分，把目标时间段移入可见区域。
+    """
+
+    def __init__(self, session, chat_list, max_loads=None, narrow_steps=None, load_timeout=None):
+        self.session = session
+        self.chat_list = chat_list
+        self.max_loads = config.BACKFILL_MAX_LOADS if max_loads is None else max_loads
+        self.narrow_steps = config.BACKFILL_NARROW_STEPS if narrow_steps is None else narrow_steps
+        self.load_timeout = config.BACKFILL_LOAD_TIMEOUT if load_timeout is None else load_timeout
+        self.loads = 0
+        self.scans = 0
+        self.reached_beginning = False
+        self.stalled = False
+
+    def scan(self):
+        self.scans += 1
+        return scan_timeline(self.chat_list)
+
+    def _scroll_pattern(self):
+        try:
+            return self.chat_list.iface_scroll
+        except Exception:
+            return None
+
+    def _load_more_item(self):
+        """列表顶部的“查看更多消息”项，不存在时返回 None"""
+        try:
+            more = self.chat_list.children(title="查看更多消息")
+            return more[0] if more else None
+        except Exception as e:
+            logging.debug(f"Could not look up load-more item: {str(e)}")
+            return None
+
+    def _trigger_load(self):
+        """触发一次加载更早的消息"""
+        # 列表顶部出现“查看更多消息”时直接点击
+        more = self._load_more_item()
+        if more is not None:
+            try:
+                more.click_input()
+                return
+            except Exception as e:
+                logging.debug(f"Could not click load-more item: {str(e)}")
+
+        # 否则把滚动条拖到顶部，列表到顶后会自动加载上一页
+        pattern = self._scroll_pattern()
+        if pattern is not None:
+            try:
+                pattern.SetScrollPercent(NO_SCROLL, 0)
+                return
+            except Exception as e:
+                logging.debug(f"ScrollPattern unavailable, falling back to mouse wheel: {str(e)}")
+        rect = self.chat_list.rectangle()
+        scroll(coords=((rect.left + rect.right) // 2, (rect.top + rect.bottom) // 2), wheel_dist=20)
+
+    def _load_once(self, count):
+        """触发一次加载并等待列表增长，返回新的已加载项数"""
+        self._trigger_load()
+        self.loads += 1
+        return self.session.wait_for_new_items(self.chat_list, count, timeout=self.load_timeout)
+
+    def load_older(self, pages, count):
+        """连续加载若干页更早的消息，返回新的已加载项数
+
+        列表没有增长时再触发一次（加载可能只是慢），仍然没有增长时：
+        “查看更多消息”已经不在才标记已到最早的消息，否则标记加载停滞。
+        """
+        for _ in range(pages):
+            if self.loads >= self.max_loads:
+                break
+            new_count = self._load_once(count)
+            if new_count == count and self.loads < self.max_loads:
+                new_count = self._load_once(count)
+            if new_count == count:
+                if self._load_more_item() is None:
+                    self.reached_beginning = True
+                else:
+                    self.stalled = True
+                break
+            count = new_count
+        return count
+
+    def scroll_to(self, target_time):
+        """加载并滚动到目标时间，返回目标时间是否已经加载"""
+        current = self.scan()
+        pages = 1
+        while current.oldest is None or current.oldest > target_time:
+            if self.reached_beginning or self.stalled or self.loads >= self.max_loads:
+                break
+
+            self.load_older(pages, current.count)
+            previous = current
+            current = self.scan()
+            logging.info(f"Backfill loaded {self.loads} pages, oldest loaded time {current.oldest}")
+
+            # 用本轮的每页时间跨度估算还需要的页数，每轮最多增长到上一轮的 4 倍
+            estimate = None
+            if previous.oldest and current.oldest and current.oldest < previous.oldest:
+                per_page = (previous.oldest - current.oldest) / pages
+                estimate = math.ceil((current.oldest - target_time) / per_page)
+            pages = min(pages * 4, max(1, estimate if estimate else pages * 2))
+
+        found = current.oldest is not None and current.oldest <= target_time
+        if found:
+            self.bring_into_view(target_time)
+        elif self.reached_beginning:
+            logging.warning(f"Reached the beginning of the chat history before {target_time}")
+        elif self.stalled:
+            logging.warning(f"Backfill stopped: no older messages loaded within {self.load_timeout}s "
+                            f"while '查看更多消息' is still shown, before reaching {target_time}")
+        else:
+            logging.warning(f"Backfill stopped after {self.loads} pages before reaching {target_time}")
+        logging.info(f"Backfill finished: {self.loads} pages loaded, {self.scans} timeline scans")
+        return found
+
+    def bring_into_view(self, target_time):
+        """按滚动百分比二分，让可见区域包含目标时间"""
+        pattern = self._scroll_pattern()
+        if pattern is None:
+            return False
+        low, high = 0.0, 100.0
+        for _ in range(self.narrow_steps):
+            middle = (low + high) / 2
+            try:
+                pattern.SetScrollPercent(NO_SCROLL, middle)
+            except Exception as e:
+                logging.debug(f"Could not set scroll position: {str(e)}")
+                return False
+            current = self.scan()
+            if current.first_visible is None:
+                return False
+            if current.first_visible > target_time:
+                high = middle
+            elif current.last_visible is not None and current.last_visible < target_time:
+                low = middle
+            else:
+                return True
+        return False
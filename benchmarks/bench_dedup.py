@@ -0,0 +1,73 @@
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dedup import MessageDeduplicator
+from synthetic import generate_transcript
+
+def legacy_is_timestamp(text):
+    """旧版 is_timestamp（每次调用重新匹配字面量正则）"""
+    full_pattern = r'\d{4}年\d{1,2}月\d{1,2}日 \d{1,2}:\d{2}'
+    time_pattern = r'^\d{1,2}:\d{2}$'
+    yesterday_pattern = r'^昨天 \d{1,2}:\d{2}$'
+    return bool(re.match(full_pattern, text) or
+                re.match(time_pattern, text) or
+                re.match(yesterday_pattern, text))
+
+def legacy_is_system_message(text):
+    """旧版 is_system_message"""
+    system_messages = ["消息", "查看更多消息", "[图片]", "撤回了一条消息"]
+    return any(msg in text for msg in system_messages)
+
+def legacy_remove_duplicates(messages):
+    """旧版 remove_duplicates（列表成员检查，O(n²)）"""
+    unique_messages = []
+    last_sender = None
+    for msg in messages:
+        if not msg.strip():
+            continue
+        if legacy_is_timestamp(msg):
+            unique_messages.append(msg)
+            continue
+        if legacy_is_system_message(msg):
+            unique_messages.append(msg)
+            continue
+        if msg != last_sender and not legacy_is_timestamp(msg) and not legacy_is_system_message(msg):
+            last_sender = msg
+            unique_messages.append(msg)
+            continue
+        if msg in unique_messages and not legacy_is_timestamp(msg) and not legacy_is_system_message(msg):
+            continue
+        unique_messages.append(msg)
+    return unique_messages
+
+def timed(func, *args):
+    """执行函数并返回 (结果, 耗时秒数)"""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark message de-duplication")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 300_000, 1_000_000])
+    parser.add_argument("--legacy-limit", type=int, default=100_000,
+                        help="largest transcript the legacy O(n²) implementation is run on")
+    args = parser.parse_args()
+
+    print(f"{'lines':>10} {'impl':>12} {'seconds':>10} {'kept':>10}")
+    for size in args.sizes:
+        transcript = generate_transcript(size)
+        if size <= args.legacy_limit:
+            result, elapsed = timed(legacy_remove_duplicates, transcript)
+            print(f"{size:>10} {'legacy':>12} {elapsed:>10.3f} {len(result):>10}")
+        result, elapsed = timed(lambda m: list(MessageDeduplicator().dedupe(m)), transcript)
+        print(f"{size:>10} {'set':>12} {elapsed:>10.3f} {len(result):>10}")
+        result, elapsed = timed(lambda m: list(MessageDeduplicator(max_entries=10_000).dedupe(m)), transcript)
+        print(f"{size:>10} {'lru-10000':>12} {elapsed:>10.3f} {len(result):>10}")
+
+if __name__ == "__main__":
+    main()
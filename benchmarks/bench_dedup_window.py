@@ -0,0 +1,54 @@
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dedup import MessageDeduplicator
+from synthetic import generate_lines, paginate
+
+def measure(make, transcript):
+    """返回 (保留的消息, 去重器占用的峰值内存字节, 耗时秒数)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    deduplicator = make()
+    kept = list(deduplicator.dedupe(transcript))
+    elapsed = time.perf_counter() - start
+    # 保留结果本身的内存不计入：先记录峰值，再减去结果列表
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return kept, peak - sys.getsizeof(kept), elapsed
+
+def compare(source, kept):
+    """与没有重叠的原始记录比较，返回 (漏掉的重复行数, 误删的行数)"""
+    expected = Counter(source)
+    actual = Counter(kept)
+    return sum((actual - expected).values()), sum((expected - actual).values())
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure sliding-window and full-history dedup against the source lines")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--windows", type=int, nargs="+", default=[100, 200, 500, 2000])
+    parser.add_argument("--page-size", type=int, default=200)
+    parser.add_argument("--overlap", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'lines':>10} {'mode':>12} {'seconds':>8} {'kept':>9} {'leaked':>8} {'lost':>8} {'peak MiB':>9}")
+    for size in args.sizes:
+        # 原始记录切成重叠的滚动页，正确的去重结果应与原始记录完全相同
+        source = generate_lines(size)
+        transcript = paginate(source, page_size=args.page_size, overlap=args.overlap)
+        modes = [("full", MessageDeduplicator)]
+        modes += [(f"window-{window}", lambda window=window: MessageDeduplicator(window=window))
+                  for window in args.windows]
+        for name, make in modes:
+            kept, peak, elapsed = measure(make, transcript)
+            leaked, lost = compare(source, kept)
+            print(f"{size:>10} {name:>12} {elapsed:>8.2f} {len(kept):>9} {leaked:>8} {lost:>8} "
+                  f"{peak / 1024 / 1024:>9.2f}")
+
+if __name__ == "__main__":
+    main()
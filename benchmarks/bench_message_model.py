@@ -0,0 +1,66 @@
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from message_types import MessageBuilder
+from synthetic import generate_lines
+
+def iter_items(lines):
+    """把合成消息行组合成 ListItem 形式：(序号, ListItem 文本, 子元素列表)
+
+    发言者名称每次都复制成新的字符串对象，模拟每次从 UIA 取回的独立字符串。
+    """
+    builder = MessageBuilder()
+    pending = None
+    for index, line in enumerate(lines):
+        if builder.from_text(line).kind != "text":
+            yield index, line, []
+        elif pending is None:
+            pending = line
+        else:
+            yield index, "", [("Button", "".join(list(pending))), ("Text", line)]
+            pending = None
+
+def build_dicts(lines):
+    """对照组：每条消息一个 dict，发言者字符串各自独立"""
+    builder = MessageBuilder()
+    records = []
+    for index, item_text, parts in iter_items(lines):
+        message = builder.build(index, item_text, parts)
+        sender = parts[0][1] if parts else None
+        records.append({"timestamp": message.timestamp, "sender": sender,
+                        "kind": message.kind, "content": message.content, "index": index})
+    return records
+
+def build_messages(lines):
+    """Message 记录，发言者经过 intern"""
+    builder = MessageBuilder()
+    return [builder.build(index, item_text, parts) for index, item_text, parts in iter_items(lines)]
+
+def measure(func, lines):
+    """返回 (记录数, 保留内存字节, 耗时秒数)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    records = func(lines)
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(records), current, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare memory of dict records and slotted Message records")
+    parser.add_argument("--lines", type=int, default=300_000)
+    args = parser.parse_args()
+
+    lines = generate_lines(args.lines)
+    for name, func in (("dict", build_dicts), ("Message", build_messages)):
+        count, size, elapsed = measure(func, lines)
+        print(f"{name:>8}: {count} records, {size / 1024 / 1024:.1f} MiB retained, "
+              f"{size / max(count, 1):.0f} B/record, {elapsed:.2f}s")
+
+if __name__ == "__main__":
+    main()
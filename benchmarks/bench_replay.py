@@ -0,0 +1,70 @@
+import argparse
+import datetime
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import generate_transcript
+from ui_snapshot import SnapshotBackend, load_snapshot, synthetic_snapshot
+from wechat_exporter import (collect_messages_after_time, extract_text_content, filter_messages_by_time,
+                             iter_messages, remove_duplicates)
+
+# 早于所有合成消息的时间，使时间过滤保留全部消息
+EARLIEST = datetime.datetime(2000, 1, 1)
+
+def bench(func, rounds):
+    """多轮执行，返回 (结果, 每轮耗时列表)"""
+    timings = []
+    result = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return result, timings
+
+def report(name, size, timings, count):
+    """按 pytest-benchmark 的风格输出 min / mean / stddev"""
+    stddev = statistics.stdev(timings) if len(timings) > 1 else 0.0
+    print(f"{name:<28} {size:>9} {min(timings) * 1000:>10.1f} {statistics.mean(timings) * 1000:>10.1f} "
+          f"{stddev * 1000:>9.1f} {len(timings):>6} {count:>9} {count / min(timings):>12.0f}")
+
+def run_suite(label, size, snapshot, rounds):
+    backend = SnapshotBackend()
+    texts, timings = bench(lambda: extract_text_content(snapshot, backend=backend), rounds)
+    report(f"{label}/extract", size, timings, len(texts))
+
+    lines, timings = bench(lambda: collect_messages_after_time(snapshot, EARLIEST, backend=backend), rounds)
+    report(f"{label}/collect", size, timings, len(lines))
+
+    unique, timings = bench(lambda: remove_duplicates(lines), rounds)
+    report(f"{label}/remove_duplicates", size, timings, len(unique))
+
+    def pipeline():
+        return list(filter_messages_by_time(iter_messages(snapshot, backend), EARLIEST))
+
+    kept, timings = bench(pipeline, rounds)
+    report(f"{label}/pipeline", size, timings, len(kept))
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay chat list snapshots through the export pipeline")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000],
+                        help="synthetic transcript sizes in lines (1000000 needs several GB of memory)")
+    parser.add_argument("--snapshot", action="append", default=[],
+                        help="replay a snapshot saved by wechat_structure-scroll.py (STRUCTURE_SNAPSHOT=true)")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'name':<28} {'size':>9} {'min ms':>10} {'mean ms':>10} {'stddev':>9} {'rounds':>6} "
+          f"{'items':>9} {'items/s':>12}")
+    for path in args.snapshot:
+        snapshot = load_snapshot(path)
+        run_suite(os.path.basename(path), len(snapshot.get("children", ())), snapshot, args.rounds)
+    for size in args.sizes:
+        snapshot = synthetic_snapshot(generate_transcript(size))
+        run_suite("synthetic", size, snapshot, args.rounds)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 启动时不应加载的重量级模块，只在需要的子命令中按需导入
+HEAVY_MODULES = ("pywinauto", "comtypes", "schedule", "tqdm", "asyncio", "multiprocessing", "logging.handlers",
+                 "sqlite3")
+
+CASES = (
+    ("import wechat_exporter", [sys.executable, "-c", "import wechat_exporter"]),
+    ("wechat_exporter --help", [sys.executable, os.path.join(ROOT, "wechat_exporter.py"), "--help"]),
+    ("wechat_exporter query --help", [sys.executable, os.path.join(ROOT, "wechat_exporter.py"), "query", "--help"]),
+    ("python -c pass", [sys.executable, "-c", "pass"]),
+)
+
+def run(command):
+    start = time.perf_counter()
+    subprocess.run(command, cwd=ROOT, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+def loaded_heavy_modules():
+    """导入 wechat_exporter 并构造命令行解析器之后已加载的重量级模块"""
+    code = ("import sys, wechat_exporter; wechat_exporter.build_parser(); "
+            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True, capture_output=True, text=True)
+    return output.stdout.strip() or "none"
+
+def import_profile(top):
+    """用 -X importtime 列出累计耗时最多的模块"""
+    output = subprocess.run([sys.executable, "-X", "importtime", "-c", "import wechat_exporter"],
+                            cwd=ROOT, check=True, capture_output=True, text=True).stderr
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            rows.append((int(cumulative), name.rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure wechat_exporter startup time")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--importtime", type=int, default=15, help="show the N slowest imports (0 to skip)")
+    args = parser.parse_args()
+
+    print(f"{'case':<30} {'min ms':>8} {'median ms':>10}")
+    for name, command in CASES:
+        timings = [run(command) for _ in range(args.rounds)]
+        print(f"{name:<30} {min(timings) * 1000:>8.1f} {statistics.median(timings) * 1000:>10.1f}")
+    print(f"\nheavy modules loaded by import: {loaded_heavy_modules()}")
+
+    if args.importtime:
+        print(f"\n{'cumulative ms':>13}  module")
+        for cumulative, name in import_profile(args.importtime):
+            print(f"{cumulative / 1000:>13.1f}  {name}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_tree import build_chat_list
+from message_types import TIMESTAMP
+from synthetic import generate_transcript
+from time_range import TimeRange
+from wechat_exporter import iter_messages
+
+def legacy_filter(messages, start_time, end_time):
+    """原来的逐条过滤：只丢弃范围外的时间戳消息本身"""
+    for msg in messages:
+        if msg.kind != TIMESTAMP or start_time <= msg.timestamp <= end_time:
+            yield msg
+
+def leaked(messages, start_time, end_time):
+    """时间段在范围外却被保留的消息条数"""
+    return sum(1 for msg in messages if msg.timestamp is not None and not start_time <= msg.timestamp <= end_time)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-message and block time-range filtering")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'lines':>9} {'mode':>8} {'best ms':>9} {'kept':>8} {'leaked':>8}")
+    for size in args.sizes:
+        messages = list(iter_messages(build_chat_list(generate_transcript(size))))
+        times = sorted({msg.timestamp for msg in messages if msg.timestamp is not None})
+        # 取中间三分之一作为时间范围
+        start_time, end_time = times[len(times) // 3], times[2 * len(times) // 3]
+        modes = (("legacy", lambda: legacy_filter(messages, start_time, end_time)),
+                 ("block", lambda: TimeRange(start_time, end_time, args.batch_size).filter(messages)))
+        for name, run in modes:
+            best = None
+            for _ in range(args.rounds):
+                start = time.perf_counter()
+                kept = list(run())
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            print(f"{size:>9} {name:>8} {best * 1000:>9.1f} {len(kept):>8} {leaked(kept, start_time, end_time):>8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import datetime
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from timestamps import classify_timestamp
+from synthetic import generate_lines
+
+def legacy_is_timestamp(text):
+    """旧版 is_timestamp"""
+    full_pattern = r'\d{4}年\d{1,2}月\d{1,2}日 \d{1,2}:\d{2}'
+    time_pattern = r'^\d{1,2}:\d{2}$'
+    yesterday_pattern = r'^昨天 \d{1,2}:\d{2}$'
+    return bool(re.match(full_pattern, text) or
+                re.match(time_pattern, text) or
+                re.match(yesterday_pattern, text))
+
+def legacy_parse_message_time(msg):
+    """旧版 parse_message_time（去掉了打印）"""
+    full_pattern = r'(\d{4})年(\d{1,2})月(\d{1,2})日 (\d{1,2}):(\d{2})'
+    time_pattern = r'(\d{1,2}):(\d{2})'
+    yesterday_pattern = r'昨天 (\d{1,2}):(\d{2})'
+    match = re.search(full_pattern, msg)
+    if match:
+        year, month, day, hour, minute = map(int, match.groups())
+        return datetime.datetime(year, month, day, hour, minute)
+    match = re.search(yesterday_pattern, msg)
+    if match:
+        hour, minute = map(int, match.groups())
+        yesterday = datetime.datetime.now() - datetime.timedelta(days=1)
+        return datetime.datetime(yesterday.year, yesterday.month, yesterday.day, hour, minute)
+    match = re.search(time_pattern, msg)
+    if match:
+        hour, minute = map(int, match.groups())
+        today = datetime.datetime.now()
+        return datetime.datetime(today.year, today.month, today.day, hour, minute)
+    return None
+
+def legacy_pass(lines):
+    """旧版：先分类再解析"""
+    return [legacy_parse_message_time(line) for line in lines if legacy_is_timestamp(line)]
+
+def new_pass(lines):
+    """新版：一次匹配完成分类和解析"""
+    result = []
+    for line in lines:
+        parsed = classify_timestamp(line)
+        if parsed:
+            result.append(parsed.time)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark timestamp classification and parsing")
+    parser.add_argument("--lines", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # 混合多种时间戳格式，并重复出现相同的时间头
+    lines = generate_lines(args.lines)
+    extra = ["昨天 20:44", "星期三 09:15", "13:05"] * (args.lines // 100)
+    lines = lines + extra
+
+    for name, func in (("legacy", legacy_pass), ("single-pass", new_pass)):
+        best = None
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            parsed = func(lines)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"{name:>12}: {best:.3f}s for {len(lines)} lines ({len(parsed)} timestamps)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_tree import CallCounter, FakeElement, build_chat_list
+from synthetic import generate_lines
+from tree_walker import TreeWalker, WrapperBackend
+
+def legacy_extract_text_content(element, messages=None):
+    """旧版递归提取"""
+    if messages is None:
+        messages = []
+    text = element.window_text()
+    if text and text.strip():
+        messages.append(text)
+    for child in element.children():
+        legacy_extract_text_content(child, messages)
+    return messages
+
+def build_chain(depth):
+    """构造一条很深的单链元素树"""
+    node = FakeElement("leaf", "Text")
+    for i in range(depth):
+        node = FakeElement(f"node {i}", "Pane", children=[node])
+    return node
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark UIA tree traversal on an in-memory fake tree")
+    parser.add_argument("--lines", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--chain-depth", type=int, default=5_000)
+    args = parser.parse_args()
+
+    for size in args.lines:
+        lines = generate_lines(size)
+        counter = CallCounter()
+        root = build_chat_list(lines, counter=counter)
+
+        counter.calls = 0
+        start = time.perf_counter()
+        legacy = legacy_extract_text_content(root)
+        legacy_elapsed = time.perf_counter() - start
+        legacy_calls = counter.calls
+
+        counter.calls = 0
+        start = time.perf_counter()
+        walked = list(TreeWalker(WrapperBackend()).iter_texts(root))
+        walker_elapsed = time.perf_counter() - start
+
+        assert walked == legacy, "walker output differs from recursive extraction"
+        print(f"{size:>8} lines: recursive {legacy_elapsed:.3f}s / {legacy_calls} calls, "
+              f"iterative {walker_elapsed:.3f}s / {counter.calls} calls")
+
+    # 递归实现会触发 RecursionError，迭代实现不受调用栈深度限制
+    chain = build_chain(args.chain_depth)
+    try:
+        legacy_extract_text_content(chain)
+        print(f"chain depth {args.chain_depth}: recursive ok")
+    except RecursionError:
+        print(f"chain depth {args.chain_depth}: recursive hit RecursionError")
+    texts = list(TreeWalker(WrapperBackend()).iter_texts(chain))
+    print(f"chain depth {args.chain_depth}: iterative extracted {len(texts)} texts")
+    limited = list(TreeWalker(WrapperBackend(), max_depth=10).iter_texts(chain))
+    print(f"chain depth {args.chain_depth}: max_depth=10 extracted {len(limited)} texts")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from waits import PhaseStats, wait_until
+
+# 旧版每次运行的固定休眠（激活、Ctrl+F、输入、回车、聚焦消息列表）
+LEGACY_SLEEPS = {"connect": 2.0, "search_box": 2.0, "search_result": 2.0, "chat_title": 3.0, "list_focus": 1.0}
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare fixed sleeps with condition-based waits on simulated UI latency")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--min-latency", type=float, default=0.05)
+    parser.add_argument("--max-latency", type=float, default=0.6)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    legacy_total = 0.0
+    stats = PhaseStats()
+    start = time.perf_counter()
+    for _ in range(args.runs):
+        for phase, legacy_sleep in LEGACY_SLEEPS.items():
+            # 模拟界面在一个随机延迟后才进入目标状态
+            ready_at = time.perf_counter() + rng.uniform(args.min_latency, args.max_latency)
+            with stats.phase(phase):
+                wait_until(lambda: time.perf_counter() >= ready_at, timeout=legacy_sleep,
+                           description=phase, stats=stats)
+            legacy_total += legacy_sleep
+    waited_total = time.perf_counter() - start
+
+    print(f"fixed sleeps:    {legacy_total:.2f}s over {args.runs} runs")
+    print(f"condition waits: {waited_total:.2f}s over {args.runs} runs")
+    for phase, entry in stats.phases.items():
+        print(f"  {phase:>14}: {entry['wait']:.2f}s waiting in {entry['waits']} waits")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worker_pool import WorkerPool, build_messages
+from bench_message_model import iter_items
+from synthetic import generate_lines
+
+def timed_capture(raw_items, capture_delay):
+    """模拟界面遍历：每个 ListItem 额外消耗 capture_delay 秒"""
+    for item in raw_items:
+        if capture_delay:
+            deadline = time.perf_counter() + capture_delay
+            while time.perf_counter() < deadline:
+                pass
+        yield item
+
+def run(raw_items, capture_delay, pool=None):
+    start = time.perf_counter()
+    captured = timed_capture(raw_items, capture_delay)
+    messages = list(pool.map_messages(captured) if pool else build_messages(captured))
+    return messages, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare inline and process-pool message post-processing")
+    parser.add_argument("--lines", type=int, default=300_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--capture-delay", type=float, default=0.0,
+                        help="simulated UI cost per ListItem in seconds")
+    args = parser.parse_args()
+
+    raw_items = list(iter_items(generate_lines(args.lines)))
+    expected, elapsed = run(raw_items, args.capture_delay)
+    print(f"  inline: {len(expected)} messages, {elapsed:.2f}s")
+
+    with WorkerPool(args.workers, batch_size=args.batch_size) as pool:
+        messages, elapsed = run(raw_items, args.capture_delay, pool)
+    print(f"    pool: {len(messages)} messages, {elapsed:.2f}s "
+          f"({args.workers} workers, batch {args.batch_size}, {pool.batches} batches)")
+    print(f"identical output: {messages == expected}")
+
+if __name__ == "__main__":
+    main()
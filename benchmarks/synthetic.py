@@ -0,0 +1,35 @@
+import datetime
+import random
+
+SENDERS = ["张三", "李四", "王五", "赵六", "小宝贝", "群主", "A旗舰船长", "路人甲"]
+PHRASES = ["收到", "好的", "明天几点开会？", "+1", "哈哈哈", "这个方案可以",
+           "我晚点看看", "已经发群文件了", "谁有最新的报表", "辛苦了"]
+
+def generate_lines(n_lines, seed=0, start=datetime.datetime(2025, 4, 17, 8, 0)):
+    """生成 n_lines 行不含重叠的合成聊天记录（时间戳、发言者、内容交替）"""
+    rng = random.Random(seed)
+    current = start
+    lines = []
+    while len(lines) < n_lines:
+        current += datetime.timedelta(minutes=rng.randint(1, 5))
+        lines.append(f"{current.year}年{current.month}月{current.day}日 {current.hour}:{current.minute:02d}")
+        for _ in range(rng.randint(1, 6)):
+            lines.append(rng.choice(SENDERS))
+            lines.append(f"{rng.choice(PHRASES)} #{len(lines)}")
+            if rng.random() < 0.05:
+                lines.append("[图片]")
+    return lines[:n_lines]
+
+def paginate(lines, page_size=200, overlap=50):
+    """把聊天记录切成相邻两页重叠 overlap 行的滚动页并依次拼接，覆盖全部行"""
+    step = max(1, page_size - overlap)
+    transcript = []
+    for offset in range(0, len(lines), step):
+        transcript.extend(lines[offset:offset + page_size])
+        if offset + page_size >= len(lines):
+            break
+    return transcript
+
+def generate_transcript(n_lines, page_size=200, overlap=50, seed=0):
+    """生成带滚动页重叠的合成聊天记录，模拟多次滚动捕获的结果"""
+    return paginate(generate_lines(n_lines, seed=seed), page_size, overlap)[:n_lines]
@@ -0,0 +1,155 @@
+import datetime
+import json
+import logging
+import os
+from collections import deque
+from message_types import TIMESTAMP, message_hash
+
+# 滚动哈希参数（模 2^61-1 的多项式哈希）
+_MODULUS = (1 << 61) - 1
+_BASE = 1_000_003
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+def line_hash(message):
+    """Message 记录的稳定哈希，取模后用于滚动哈希"""
+    return message_hash(message) % _MODULUS
+
+class RollingHash:
+    """固定窗口的滚动哈希，用于在新的消息流中定位上次导出的末尾"""
+
+    def __init__(self, size):
+        self.size = size
+        self.window = deque()
+        self.value = 0
+        self._top = pow(_BASE, size - 1, _MODULUS) if size > 0 else 0
+
+    def push(self, h):
+        """加入一个行哈希，窗口已满时移出最早的一个"""
+        if self.size <= 0:
+            return self.value
+        if len(self.window) == self.size:
+            oldest = self.window.popleft()
+            self.value = (self.value - oldest * self._top) % _MODULUS
+        self.window.append(h)
+        self.value = (self.value * _BASE + h) % _MODULUS
+        return self.value
+
+    def full(self):
+        return len(self.window) == self.size
+
+class Checkpoint:
+    """单个群聊的导出检查点：最后导出的时间戳和末尾若干行的滚动哈希"""
+
+    def __init__(self, group, last_time=None, tail_size=0, tail_hash=None, updated_at=None):
+        self.group = group
+        self.last_time = last_time
+        self.tail_size = tail_size
+        self.tail_hash = tail_hash
+        self.updated_at = updated_at
+
+    def to_dict(self):
+        return {
+            "group": self.group,
+            "last_time": self.last_time.strftime(TIME_FORMAT) if self.last_time else None,
+            "tail_size": self.tail_size,
+            "tail_hash": self.tail_hash,
+            "updated_at": self.updated_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        last_time = data.get("last_time")
+        return cls(
+            data["group"],
+            datetime.datetime.strptime(last_time, TIME_FORMAT) if last_time else None,
+            data.get("tail_size", 0),
+            data.get("tail_hash"),
+            data.get("updated_at"),
+        )
+
+def checkpoint_path(export_path, group):
+    """检查点文件路径"""
+    return os.path.join(export_path, ".checkpoints", f"{group}.json")
+
+def load_checkpoint(export_path, group):
+    """读取检查点，不存在或损坏时返回 None"""
+    path = checkpoint_path(export_path, group)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return Checkpoint.from_dict(json.load(f))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logging.error(f"Error loading checkpoint {path}: {str(e)}")
+        return None
+
+def save_checkpoint(export_path, checkpoint):
+    """原子地写入检查点"""
+    path = checkpoint_path(export_path, checkpoint.group)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    checkpoint.updated_at = datetime.datetime.now().strftime(TIME_FORMAT)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint.to_dict(), f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+class IncrementalFilter:
+    """只放行检查点之后的新消息，并为下一次运行记录新的检查点
+
+    早于检查点时间的时间段整体跳过，晚于检查点时间的时间段整体放行。
+    与检查点同一分钟的时间段中，只有在消息流里重新找到上次导出的末尾之后的行才放行。
+    """
+
+    def __init__(self, checkpoint, group, tail_size):
+        self.checkpoint = checkpoint
+        self.group = group
+        self.tail_size = tail_size
+        self.current_time = None
+        self.latest_time = checkpoint.last_time if checkpoint else None
+        self.skipped = 0
+        self.passed = 0
+        self._matched = checkpoint is None or checkpoint.last_time is None
+        self._match_hash = RollingHash(checkpoint.tail_size if checkpoint else 0)
+        self._tail = RollingHash(tail_size)
+
+    def _is_new(self):
+        if self._matched:
+            return True
+        return self.current_time is not None and self.current_time > self.checkpoint.last_time
+
+    def filter(self, messages):
+        """过滤 Message 记录流，返回新消息的生成器"""
+        checkpoint = self.checkpoint
+        for msg in messages:
+            h = line_hash(msg)
+            self._tail.push(h)
+
+            if msg.kind == TIMESTAMP:
+                self.current_time = msg.timestamp
+                if self.latest_time is None or msg.timestamp > self.latest_time:
+                    self.latest_time = msg.timestamp
+
+            new = self._is_new()
+            if not self._matched and checkpoint.tail_hash is not None:
+                # 找到上次导出的末尾后，之后的行都是新消息
+                if self._match_hash.push(h) == checkpoint.tail_hash and self._match_hash.full():
+                    self._matched = True
+                    logging.info(f"Checkpoint tail matched for group '{self.group}'")
+
+            if new:
+                self.passed += 1
+                yield msg
+            else:
+                self.skipped += 1
+
+        if not self._matched:
+            logging.warning(f"Checkpoint tail not found for group '{self.group}', "
+                            f"only messages after {checkpoint.last_time} were exported")
+
+    def next_checkpoint(self):
+        """根据本次处理过的消息流生成新的检查点"""
+        if not self._tail.window and self.checkpoint is not None:
+            # 本次没有处理任何消息，沿用旧的检查点
+            return self.checkpoint
+        return Checkpoint(self.group, self.latest_time, len(self._tail.window), self._tail.value)
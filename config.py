@@ -7,10 +7,17 @@ load_dotenv()
 # 微信窗口配置
 WECHAT_WINDOW_TITLE = "微信"
 WECHAT_WINDOW_CLASS = "WeChatMainWndForPC"
+WECHAT_SESSION_LIST_TITLE = "会话"  # 左侧会话列表的名称，搜索结果不在其中查找
 
 # 目标群聊名称
 TARGET_GROUP = os.getenv("TARGET_GROUP", "A旗舰船队")
 
+# 批量导出的群聊列表，逗号分隔；未设置时只导出 TARGET_GROUP
+TARGET_GROUPS = [group.strip() for group in os.getenv("TARGET_GROUPS", TARGET_GROUP).split(",") if group.strip()]
+
+# 群聊列表文件，每行一个群名（优先于 TARGET_GROUPS）
+GROUPS_FILE = os.getenv("GROUPS_FILE", "")
+
 # 导出文件保存路径
 EXPORT_PATH = os.getenv("EXPORT_PATH", "exports")
 
@@ -24,8 +31,75 @@ END_TIME = os.getenv("END_TIME", "2025-04-18 19:00:00")      # 空字符串表
 
 # 结构导出配置
 MAX_SCROLL_ATTEMPTS = int(os.getenv("MAX_SCROLL_ATTEMPTS", "1"))  # 最大滚动次数
-SCROLL_WAIT_TIME = float(os.getenv("SCROLL_WAIT_TIME", "0.5"))      # 每次滚动后的等待时间（秒）
+SCROLL_WAIT_TIME = float(os.getenv("SCROLL_WAIT_TIME", "0.5"))      # 每次滚动后等待新消息加载的最长时间（秒）
+INCREMENTAL_CAPTURE = os.getenv("INCREMENTAL_CAPTURE", "true").lower() == "true"  # 每次滚动只捕获新加载的消息项
+
+# 界面等待配置
+WAIT_TIMEOUT = float(os.getenv("WAIT_TIMEOUT", "10"))                # 等待界面状态的超时时间（秒）
+WAIT_POLL_INTERVAL = float(os.getenv("WAIT_POLL_INTERVAL", "0.05"))  # 首次轮询间隔（秒），之后逐步增大
+WAIT_MAX_INTERVAL = float(os.getenv("WAIT_MAX_INTERVAL", "0.5"))     # 最大轮询间隔（秒）
+
+# 结构导出时是否同时保存消息列表快照（用于离线回放和基准测试）
+STRUCTURE_SNAPSHOT = os.getenv("STRUCTURE_SNAPSHOT", "false").lower() == "true"
+# 结构导出格式：ndjson（逐元素写出的压缩转储，可用 structure_dump.py 渲染为文本）或 text（原来的缩进文本）
+STRUCTURE_FORMAT = os.getenv("STRUCTURE_FORMAT", "ndjson").lower()
+
+# 元素树遍历配置
+TREE_MAX_DEPTH = int(os.getenv("TREE_MAX_DEPTH", "0"))  # 最大遍历深度，0 表示不限制
+
+# 文本去重配置（remove_duplicates，用于拼接的多页文本；导出流水线的消息记录不去重）
+DEDUP_MAX_ENTRIES = int(os.getenv("DEDUP_MAX_ENTRIES", "0"))  # 最多比对的历史行数，0 表示不限制
+DEDUP_WINDOW = int(os.getenv("DEDUP_WINDOW", "0"))            # 滑动窗口大小（最近多少行），0 表示不使用窗口
+
+# 导出写入配置
+EXPORT_FLUSH_EVERY = int(os.getenv("EXPORT_FLUSH_EVERY", "50"))  # 每写入多少条消息刷新一次文件
+
+# 机器可读存档格式，逗号分隔：jsonl（追加写入的 JSONL）、columnar（可内存映射的列式目录），留空表示不写存档
+ARCHIVE_FORMATS = [fmt.strip() for fmt in os.getenv("ARCHIVE_FORMATS", "jsonl").split(",") if fmt.strip()]
+
+# SQLite 消息库配置
+SQLITE_STORE = os.getenv("SQLITE_STORE", "false").lower() == "true"           # 是否同时写入 SQLite 消息库
+SQLITE_PATH = os.getenv("SQLITE_PATH", os.path.join(EXPORT_PATH, "messages.db"))  # 消息库文件路径
+SQLITE_BATCH_SIZE = int(os.getenv("SQLITE_BATCH_SIZE", "500"))                 # 每个事务写入的消息条数
+
+# 增量导出配置
+INCREMENTAL_EXPORT = os.getenv("INCREMENTAL_EXPORT", "false").lower() == "true"  # 是否默认使用增量导出
+CHECKPOINT_TAIL_SIZE = int(os.getenv("CHECKPOINT_TAIL_SIZE", "20"))  # 检查点记录的末尾消息行数
+
+# 历史回填配置
+BACKFILL = os.getenv("BACKFILL", "false").lower() == "true"  # 可见区域没有目标时间时是否自动向上加载历史消息
+BACKFILL_MAX_LOADS = int(os.getenv("BACKFILL_MAX_LOADS", "500"))                # 最多加载多少页历史消息
+BACKFILL_NARROW_STEPS = int(os.getenv("BACKFILL_NARROW_STEPS", "8"))            # 把目标时间移入可见区域的最多二分步数
+BACKFILL_LOAD_TIMEOUT = float(os.getenv("BACKFILL_LOAD_TIMEOUT", str(WAIT_TIMEOUT)))  # 每次加载历史消息等待列表增长的最长时间（秒）
+
+# 后处理进程池配置
+POSTPROCESS_WORKERS = int(os.getenv("POSTPROCESS_WORKERS", "0"))         # 解析消息的工作进程数，0 或 1 表示在主进程中处理
+POSTPROCESS_BATCH_SIZE = int(os.getenv("POSTPROCESS_BATCH_SIZE", "500"))  # 每批交给工作进程的 ListItem 数
+POSTPROCESS_MAX_PENDING = int(os.getenv("POSTPROCESS_MAX_PENDING", "0"))  # 最多同时排队的批次数，0 表示工作进程数的两倍
+
+# 导出索引：按群聊记录已导出消息的内容哈希（EXPORT_PATH/.index），重复导出时只写入新消息
+EXPORT_INDEX = os.getenv("EXPORT_INDEX", "true").lower() == "true"
+
+# 原始采集：每次运行把界面采集到的原始消息项压缩保存到 EXPORT_PATH/.captures，可用 reprocess 子命令离线重新处理
+RAW_CAPTURE = os.getenv("RAW_CAPTURE", "true").lower() == "true"
+
+# 异步导出配置
+ASYNC_EXPORT = os.getenv("ASYNC_EXPORT", "false").lower() == "true"  # 界面操作放在专用线程，解析和写入与之并行
+ASYNC_BATCH_SIZE = int(os.getenv("ASYNC_BATCH_SIZE", "200"))  # 阶段之间每批传递的条数
+ASYNC_QUEUE_SIZE = int(os.getenv("ASYNC_QUEUE_SIZE", "4"))    # 阶段之间最多排队的批次数，写满时上游暂停
+
+# 消息列表定位缓存配置
+LOCATOR_CACHE = os.getenv("LOCATOR_CACHE", "true").lower() == "true"  # 是否缓存消息列表控件的定位结果
+LOCATOR_CACHE_PATH = os.getenv("LOCATOR_CACHE_PATH", os.path.join(EXPORT_PATH, ".locator_cache.json"))  # 定位缓存文件路径
+
+# 常驻模式配置
+DAEMON_INTERVAL = int(os.getenv("DAEMON_INTERVAL", "60"))  # 未单独配置计划的群聊每隔多少分钟导出一次
+GROUP_SCHEDULES = os.getenv("GROUP_SCHEDULES", "")         # 单独的导出计划，如 群聊A=15m,群聊B=09:30
 
-# 确保导出目录和日志目录存在
-os.makedirs(EXPORT_PATH, exist_ok=True)
-os.makedirs(LOG_PATH, exist_ok=True) 
\ No newline at end of file
+# 诊断配置
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()                        # 日志级别，排查问题时设为 DEBUG，逐条跟踪消息设为 TRACE
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))   # 主日志文件轮转大小（字节）
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))               # 保留的轮转日志文件数
+LOG_BUFFER_RECORDS = int(os.getenv("LOG_BUFFER_RECORDS", "200"))         # 日志文件缓冲的记录数，遇到 ERROR 立即写盘
+PROFILE = os.getenv("PROFILE", "false").lower() == "true"                # 是否用 cProfile 记录每次运行
+TRACE_MEMORY = os.getenv("TRACE_MEMORY", "false").lower() == "true"      # 是否用 tracemalloc 记录内存分配
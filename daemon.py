@@ -0,0 +1,160 @@
+import datetime
+import json
+import logging
+import os
+import time
+from collections import deque
+import schedule
+import config
+from waits import PhaseStats
+
+def parse_plan(plan):
+    """校验计划字符串，返回 ("minutes", 分钟数) 或 ("daily", "HH:MM")"""
+    if plan.endswith("m"):
+        try:
+            minutes = int(plan[:-1])
+        except ValueError:
+            minutes = 0
+        if minutes <= 0:
+            raise Exception(f"Invalid schedule '{plan}': interval must be a positive number of minutes, such as 15m")
+        return "minutes", minutes
+    try:
+        at = datetime.datetime.strptime(plan, "%H:%M")
+    except ValueError:
+        raise Exception(f"Invalid schedule '{plan}', expected minutes such as 15m or a daily time such as 09:30")
+    return "daily", at.strftime("%H:%M")
+
+def parse_group_schedules(value, groups, default_interval):
+    """解析每个群聊的导出计划
+
+    格式为逗号分隔的“群名=计划”，计划为“15m”（每 15 分钟）或“09:30”（每天定时）。
+    未列出的群聊按 default_interval 分钟执行；只为 groups 中的群聊安排计划，
+    其他群聊的条目记录警告后忽略。计划无效时抛出异常。返回 {群名: 计划字符串}。
+    """
+    default_plan = f"{default_interval}m"
+    if default_interval <= 0:
+        raise Exception(f"Invalid DAEMON_INTERVAL {default_interval}: must be a positive number of minutes")
+    plans = {group: default_plan for group in groups}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        if "=" not in item:
+            raise Exception(f"Invalid group schedule '{item}', expected 群名=15m or 群名=09:30")
+        group, plan = item.rsplit("=", 1)
+        group, plan = group.strip(), plan.strip()
+        try:
+            parse_plan(plan)
+        except Exception as e:
+            raise Exception(f"Group '{group}': {str(e)}")
+        if group not in plans:
+            logging.warning(f"Ignoring schedule for '{group}': not among the groups to export")
+            continue
+        plans[group] = plan
+    return plans
+
+def schedule_job(scheduler, plan, job, *args):
+    """按计划字符串注册任务"""
+    kind, value = parse_plan(plan)
+    if kind == "minutes":
+        return scheduler.every(value).minutes.do(job, *args)
+    return scheduler.every().day.at(value).do(job, *args)
+
+class RunStats:
+    """记录每个群聊最近若干次导出的耗时和结果"""
+
+    def __init__(self, history=100):
+        self.history = history
+        self.runs = {}
+
+    def record(self, group, seconds, count, error=None, phases=None):
+        runs = self.runs.setdefault(group, deque(maxlen=self.history))
+        runs.append({"at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                     "seconds": round(seconds, 3), "count": count, "error": error, "phases": phases})
+
+    def summary(self, group):
+        """单个群聊的耗时统计：次数、失败次数、最近一次、平均值、p50、p95、最大值"""
+        runs = self.runs.get(group) or ()
+        durations = sorted(run["seconds"] for run in runs)
+        if not durations:
+            return {"runs": 0}
+        return {
+            "runs": len(durations),
+            "failures": sum(1 for run in runs if run["error"]),
+            "last": runs[-1]["seconds"],
+            "mean": round(sum(durations) / len(durations), 3),
+            "p50": durations[len(durations) // 2],
+            "p95": durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+            "max": durations[-1],
+        }
+
+    def write(self, path):
+        """原子地写入全部群聊的统计和最近的运行记录"""
+        data = {group: {"summary": self.summary(group), "recent": list(runs)} for group, runs in self.runs.items()}
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+class ExportDaemon:
+    """常驻导出进程
+
+    整个生命周期只连接一次微信窗口，消息列表控件和进程池都保持可用；
+    窗口句柄失效（微信重启或窗口关闭）时才重新连接。每个群聊按自己的计划导出，
+    每次运行后记录耗时并写入统计文件，再调用 flush_logs 把缓冲的日志写盘。
+    """
+
+    def __init__(self, session, export, plans, stats_path=None, flush_logs=None):
+        self.session = session
+        self.export = export
+        self.plans = plans
+        self.flush_logs = flush_logs
+        self.stats_path = stats_path or os.path.join(config.LOG_PATH, "daemon_stats.json")
+        self.stats = RunStats()
+        self.scheduler = schedule.Scheduler()
+        self.reconnects = 0
+
+    def ensure_connected(self):
+        """窗口句柄失效时重新连接"""
+        if self.session.is_alive():
+            return
+        if self.session.window is not None:
+            self.reconnects += 1
+            logging.warning("WeChat window is gone, reconnecting...")
+        self.session.connect()
+
+    def run_group(self, group):
+        """执行一次群聊导出，异常只记录不抛出，以免中断调度"""
+        self.session.stats = PhaseStats()
+        start = time.perf_counter()
+        count, error = 0, None
+        try:
+            self.ensure_connected()
+            count = self.export(self.session, group)
+        except Exception as e:
+            error = str(e)
+            logging.error(f"Scheduled export of '{group}' failed: {error}")
+        elapsed = time.perf_counter() - start
+
+        self.stats.record(group, elapsed, count, error, self.session.stats.to_dict())
+        summary = self.stats.summary(group)
+        logging.info(f"Run '{group}': {elapsed:.2f}s, {count} messages; "
+                     f"{summary['runs']} runs, mean {summary['mean']:.2f}s, p95 {summary['p95']:.2f}s, "
+                     f"{summary['failures']} failed")
+        self.session.stats.log_summary()
+        try:
+            self.stats.write(self.stats_path)
+        except Exception as e:
+            logging.error(f"Error writing daemon stats: {str(e)}")
+        if self.flush_logs is not None:
+            self.flush_logs()
+
+    def run_forever(self, poll_interval=1.0):
+        """注册所有计划，先各执行一次，然后按计划循环执行"""
+        for group, plan in self.plans.items():
+            schedule_job(self.scheduler, plan, self.run_group, group)
+            logging.info(f"Scheduled group '{group}': {plan}")
+        self.scheduler.run_all()
+        while True:
+            self.scheduler.run_pending()
+            idle = self.scheduler.idle_seconds
+            time.sleep(poll_interval if idle is None else max(0.0, min(idle, poll_interval)))
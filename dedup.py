@@ -0,0 +1,155 @@
+from collections import deque
+from message_types import is_timestamp, is_system_message
+
+# 记录每行最近出现位置的个数：重叠页只会从最近的几页开始重复
+MAX_POSITIONS = 32
+# 从内容行（条目中间）开始的重复段至少要这么多行才认为是重复采集
+MIN_PARTIAL_RUN = 3
+
+class MessageDeduplicator:
+    """线性时间的文本消息去重
+
+    用于多次滚动采集拼接起来的文本行（remove_duplicates）。导出流水线中的 Message 记录每个 ListItem
+    只遍历一次，不会重复，不经过去重；重复运行之间的重复由导出索引处理。
+
+    按滚动页重叠来去重：新的一页从上一页末尾之前的某处开始，重复的是已保留内容的一段后缀。
+    输入行与已保留的行逐行比对，从某个条目开头（时间戳、系统消息或发言者行）一直匹配到已保留内容的末尾时，
+    这一段（包括其中的时间戳）整体丢弃；中途不匹配则按原样保留。发言者和内容总是一起保留或丢弃，
+    同一发言者重复说的话不在已保留内容的末尾时不会被去掉。从内容行开始的重复段（页从一条消息中间切开）
+    至少要 MIN_PARTIAL_RUN 行。
+    window（或 max_entries）设置时只与最近这么多行（成批清理，至多两倍）比对，内存与导出长度无关；
+    都不设置时保留全部历史。
+    """
+
+    def __init__(self, max_entries=None, window=None):
+        self.max_entries = max_entries
+        self.window = window
+        self.limit = window or max_entries
+        self._lines = []
+        self._starts = []
+        self._offset = 0
+        self._positions = {}
+        self._expect_content = False
+        self._pending = []
+        self._runs = []
+        self.kept = 0
+        self.dropped = 0
+
+    def _keep(self, line, kept):
+        """保留一行，记入历史"""
+        if is_timestamp(line) or is_system_message(line):
+            is_start = True
+            self._expect_content = False
+        else:
+            # 时间戳和系统消息之后按“发言者、内容”交替
+            is_start = not self._expect_content
+            self._expect_content = is_start
+        lines = self._lines
+        index = self._offset + len(lines)
+        lines.append(line)
+        self._starts.append(is_start)
+        positions = self._positions.setdefault(line, [])
+        positions.append(index)
+        if len(positions) > MAX_POSITIONS:
+            del positions[0]
+        if self.limit and len(lines) >= 2 * self.limit:
+            self._forget(len(lines) - self.limit)
+        self.kept += 1
+        kept.append(line)
+
+    def _forget(self, count):
+        """一次移出最早的 count 行（成批移出，均摊每行常数时间）"""
+        offset = self._offset + count
+        for old in self._lines[:count]:
+            positions = self._positions.get(old)
+            if positions is None:
+                continue
+            while positions and positions[0] < offset:
+                del positions[0]
+            if not positions:
+                del self._positions[old]
+        del self._lines[:count]
+        del self._starts[:count]
+        self._offset = offset
+
+    def _match(self, line, kept, queue):
+        """把一行与正在比对的重复段候选比较"""
+        pending = self._pending
+        lines = self._lines
+        offset = self._offset
+        if not pending:
+            positions = self._positions.get(line)
+            if not positions:
+                self._keep(line, kept)
+                return
+            # 只有一行的重复段：与最后保留的条目开头相同（例如同一发言者名称出现两次）
+            if positions[-1] == offset + len(lines) - 1 and self._starts[-1]:
+                self.dropped += 1
+                return
+            # 候选的起点等第二行到来时再找，内容行出现的位置少，比发言者行快得多
+            pending.append(line)
+            return
+
+        if len(pending) == 1:
+            first = pending[0]
+            starts = self._starts
+            self._runs = [(start - 1, starts[start - 1 - offset]) for start in reversed(self._positions.get(line, ()))
+                          if start > offset and lines[start - 1 - offset] == first]
+        else:
+            step = len(pending)
+            self._runs = [(start, is_start) for start, is_start in self._runs
+                          if start + step - offset < len(lines) and lines[start + step - offset] == line]
+        pending.append(line)
+
+        end = offset + len(lines)
+        length = len(pending)
+        runs = []
+        for start, is_start in self._runs:
+            if start + length < end:
+                runs.append((start, is_start))
+            elif is_start or length >= MIN_PARTIAL_RUN:
+                # 一直匹配到已保留内容的末尾：整段是重复采集
+                self.dropped += length
+                self._pending = []
+                self._runs = []
+                return
+        self._runs = runs
+        if not runs:
+            # 比对失败：第一行保留，其余各行重新比对
+            self._pending = []
+            self._keep(pending[0], kept)
+            queue.extendleft(reversed(pending[1:]))
+
+    def _drain(self, queue, kept):
+        while queue:
+            self._match(queue.popleft(), kept, queue)
+
+    def feed(self, msg):
+        """处理一行文本，返回此时可以确定保留的行"""
+        # 跳过空消息
+        if not msg.strip():
+            return ()
+        kept = []
+        queue = deque()
+        self._match(msg, kept, queue)
+        if queue:
+            self._drain(queue, kept)
+        return kept
+
+    def flush(self):
+        """输入结束：正在比对、尚未确认的行按原样保留，返回保留的行"""
+        kept = []
+        while self._pending:
+            pending = self._pending
+            self._pending = []
+            self._runs = []
+            self._keep(pending[0], kept)
+            self._drain(deque(pending[1:]), kept)
+        return kept
+
+    def dedupe(self, messages):
+        """逐条去重，返回保留消息的生成器"""
+        feed = self.feed
+        for msg in messages:
+            yield from feed(msg)
+        yield from self.flush()
@@ -0,0 +1,131 @@
+import logging
+import os
+from array import array
+from bisect import bisect_left
+from itertools import chain
+from message_types import TIMESTAMP, text_hash
+
+# 布隆过滤器参数：每条约 10 位、4 个哈希位置（双重哈希），误判率约 1%
+BITS_PER_ENTRY = 10
+BLOOM_HASHES = 4
+MIN_BLOOM_BITS = 1 << 16
+
+def index_key(message):
+    """已导出消息的内容键：时间段（精确到分钟）、类型、发言者和内容"""
+    minute = message.timestamp.strftime("%Y-%m-%d %H:%M") if message.timestamp else ""
+    return text_hash(f"{minute}\x1f{message.kind}\x1f{message.sender or ''}\x1f{message.content}")
+
+def index_paths(export_path, group):
+    """(哈希文件, 布隆过滤器文件) 路径"""
+    base = os.path.join(export_path, ".index", group)
+    return base + ".hashes", base + ".bloom"
+
+class ExportIndex:
+    """按群聊保存已导出消息内容哈希的磁盘索引
+
+    精确存储是升序的 64 位哈希数组，布隆过滤器放在前面：大部分新消息只查几个位就能确定不在索引中，
+    命中时再在数组上二分确认。两个文件都以原始字节读写，启动时不逐条解析。
+    查询只针对启动时加载的索引，本次运行新增的键在 save() 时合并写回。
+    """
+
+    def __init__(self, export_path, group):
+        self.group = group
+        self.hashes_path, self.bloom_path = index_paths(export_path, group)
+        self.skipped = 0
+        self._hashes = array('q')
+        self._bloom = bytearray(MIN_BLOOM_BITS // 8)
+        self._new = []
+        self._load()
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def _load(self):
+        try:
+            with open(self.hashes_path, 'rb') as f:
+                self._hashes.frombytes(f.read())
+        except FileNotFoundError:
+            return
+        try:
+            with open(self.bloom_path, 'rb') as f:
+                data = f.read()
+            # 布隆过滤器文件开头记录建立时的条目数，与哈希文件不一致时重建
+            if int.from_bytes(data[:8], 'little') == len(self._hashes) and len(data) > 8:
+                self._bloom = bytearray(data[8:])
+                return
+        except FileNotFoundError:
+            pass
+        logging.info(f"Rebuilding export index filter for group '{self.group}'")
+        self._rebuild_bloom(self._hashes)
+
+    def _rebuild_bloom(self, keys):
+        bits = MIN_BLOOM_BITS
+        while bits < len(keys) * BITS_PER_ENTRY:
+            bits *= 2
+        self._bloom = bytearray(bits // 8)
+        self._add_bloom(keys)
+
+    def _add_bloom(self, keys):
+        bloom = self._bloom
+        bits = len(bloom) * 8
+        for key in keys:
+            position = key & 0xFFFFFFFF
+            step = (key >> 32) | 1
+            for _ in range(BLOOM_HASHES):
+                position %= bits
+                bloom[position >> 3] |= 1 << (position & 7)
+                position += step
+
+    def __contains__(self, key):
+        bloom = self._bloom
+        bits = len(bloom) * 8
+        position = key & 0xFFFFFFFF
+        step = (key >> 32) | 1
+        for _ in range(BLOOM_HASHES):
+            position %= bits
+            if not bloom[position >> 3] & (1 << (position & 7)):
+                return False
+            position += step
+        hashes = self._hashes
+        i = bisect_left(hashes, key)
+        return i < len(hashes) and hashes[i] == key
+
+    def filter(self, messages):
+        """只放行索引中没有的消息
+
+        时间戳本身是新的才直接放行；已导出过的时间戳先暂存，下面出现新消息时再一起放行。
+        """
+        pending = None
+        for msg in messages:
+            key = index_key(msg)
+            if key in self:
+                if msg.kind == TIMESTAMP:
+                    pending = msg
+                else:
+                    self.skipped += 1
+                continue
+            if pending is not None and msg.kind != TIMESTAMP:
+                yield pending
+            pending = None
+            self._new.append(key)
+            yield msg
+
+    def save(self):
+        """把本次新增的键合并进索引，原子地写回两个文件"""
+        if not self._new:
+            return
+        os.makedirs(os.path.dirname(self.hashes_path), exist_ok=True)
+        merged = array('q', sorted(set(chain(self._hashes, self._new))))
+        if len(merged) * BITS_PER_ENTRY > len(self._bloom) * 8:
+            self._rebuild_bloom(merged)
+        else:
+            self._add_bloom(self._new)
+        self._hashes = merged
+        self._new = []
+
+        for path, data in ((self.hashes_path, merged.tobytes()),
+                           (self.bloom_path, len(merged).to_bytes(8, 'little') + bytes(self._bloom))):
+            tmp_path = path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
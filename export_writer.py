@@ -0,0 +1,143 @@
+import os
+
+def open_new_file(filepath):
+    """以独占方式新建文件，同名文件已存在时依次尝试 名称_2、名称_3……，返回 (文件对象, 实际路径)"""
+    base, ext = os.path.splitext(filepath)
+    path = filepath
+    suffix = 1
+    while True:
+        try:
+            return open(path, 'x', encoding='utf-8'), path
+        except FileExistsError:
+            suffix += 1
+            path = f"{base}_{suffix}{ext}"
+
+class MarkdownExportWriter:
+    """逐条写入 Markdown 导出文件
+
+    写入第一条消息时才新建文件并写入文件头，之后每写入 flush_every 条消息刷新一次；
+    没有消息可写时不创建文件。文件以独占方式新建，不会覆盖已有的导出，重名时加序号，
+    实际路径见 filepath。overwrite 为 True 时打开即覆盖 filepath（用于重新生成的输出）。
+    导出中途出错时会在文件末尾追加中断说明，已写入的内容仍是完整的 Markdown。
+    """
+
+    def __init__(self, filepath, group, export_time, start_time=None, end_time=None, flush_every=50,
+                 overwrite=False):
+        self.filepath = filepath
+        self.group = group
+        self.export_time = export_time
+        self.start_time = start_time
+        self.end_time = end_time
+        self.flush_every = max(1, flush_every)
+        self.overwrite = overwrite
+        self.count = 0
+        self._file = None
+
+    def __enter__(self):
+        if self.overwrite:
+            self._open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and self._file is None:
+            # 还没写入任何消息就出错：仍然留下文件记录失败原因
+            self._open()
+        if self._file is not None:
+            try:
+                if exc_type is not None:
+                    self._file.write(f"> 导出未完成，已写入 {self.count} 条消息: {exc}\n")
+            finally:
+                self._file.close()
+                self._file = None
+        return False
+
+    def _open(self):
+        if self.overwrite:
+            self._file = open(self.filepath, 'w', encoding='utf-8')
+        else:
+            self._file, self.filepath = open_new_file(self.filepath)
+        self._write_header()
+
+    def _write_header(self):
+        f = self._file
+        f.write(f"# {self.group} 聊天记录 - {self.export_time.strftime('%Y-%m-%d %H:%M')}\n\n")
+        if self.start_time:
+            f.write(f"开始时间: {self.start_time}\n")
+        if self.end_time:
+            f.write(f"结束时间: {self.end_time}\n")
+        f.write(f"导出时间: {self.export_time}\n\n")
+        f.flush()
+
+    def write_message(self, message):
+        """写入一条 Message 记录"""
+        if self._file is None:
+            self._open()
+        self._file.write(''.join(f"{line}\n\n" for line in message.lines()))
+        self.count += 1
+        if self.count % self.flush_every == 0:
+            self._file.flush()
+
+    def write_all(self, messages):
+        """写入消息流，返回写入条数"""
+        for message in messages:
+            self.write_message(message)
+        return self.count
+
+class DailyMarkdownWriter:
+    """按消息日期分区追加写入 Markdown 文件（增量导出使用）
+
+    每天一个文件：群名_messages_YYYY-MM-DD.md。消息所在时间段决定它属于哪一天，
+    第一条时间戳之前的消息写入 default_date 对应的文件。
+    """
+
+    def __init__(self, export_path, group, default_date, flush_every=50):
+        self.export_path = export_path
+        self.group = group
+        self.flush_every = max(1, flush_every)
+        self.count = 0
+        self.files = []
+        self._date = default_date
+        self._open_date = None
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._file is not None:
+            try:
+                if exc_type is not None:
+                    self._file.write(f"> 导出未完成，已写入 {self.count} 条消息: {exc}\n")
+            finally:
+                self._file.close()
+                self._file = None
+        return False
+
+    def _switch(self, date):
+        if self._file is not None:
+            self._file.close()
+        filepath = os.path.join(self.export_path, f"{self.group}_messages_{date.strftime('%Y-%m-%d')}.md")
+        is_new = not os.path.exists(filepath) or os.path.getsize(filepath) == 0
+        self._file = open(filepath, 'a', encoding='utf-8')
+        if is_new:
+            self._file.write(f"# {self.group} 聊天记录 - {date.strftime('%Y-%m-%d')}\n\n")
+            self._file.flush()
+        self._open_date = date
+        self.files.append(filepath)
+
+    def write_message(self, message):
+        """写入一条 Message 记录，跨天时切换文件"""
+        if message.timestamp is not None:
+            self._date = message.timestamp.date()
+        if self._file is None or self._date != self._open_date:
+            self._switch(self._date)
+        self._file.write(''.join(f"{line}\n\n" for line in message.lines()))
+        self.count += 1
+        if self.count % self.flush_every == 0:
+            self._file.flush()
+
+    def write_all(self, messages):
+        """写入消息流，返回写入条数"""
+        for message in messages:
+            self.write_message(message)
+        return self.count
@@ -0,0 +1,105 @@
+from collections import namedtuple
+from message_types import is_timestamp, is_system_message
+
+FakeRect = namedtuple("FakeRect", ["left", "top", "right", "bottom"])
+
+class CallCounter:
+    """统计假元素上的属性调用次数，用来模拟跨进程 COM 调用开销"""
+
+    def __init__(self):
+        self.calls = 0
+
+class FakeElementInfo:
+    """假元素的 element_info，与 pywinauto 的 UIAElementInfo 一样以属性提供控件信息"""
+
+    def __init__(self, element):
+        self._element = element
+
+    @property
+    def control_type(self):
+        self._element._count()
+        return self._element._control_type
+
+    @property
+    def class_name(self):
+        self._element._count()
+        return self._element._class_name
+
+    @property
+    def automation_id(self):
+        self._element._count()
+        return self._element._automation_id
+
+    runtime_id = None
+
+class FakeElement:
+    """内存中的假 UIA 元素，接口与 pywinauto 包装对象一致"""
+
+    def __init__(self, text="", control_type="Pane", rect=(0, 0, 0, 0), class_name="",
+                 automation_id="", children=None, counter=None, visible=True):
+        self._text = text
+        self._control_type = control_type
+        self._rect = FakeRect(*rect)
+        self._class_name = class_name
+        self._automation_id = automation_id
+        self._children = list(children or [])
+        self._visible = visible
+        self.counter = counter
+
+    def _count(self):
+        if self.counter is not None:
+            self.counter.calls += 1
+
+    def window_text(self):
+        self._count()
+        return self._text
+
+    @property
+    def element_info(self):
+        return FakeElementInfo(self)
+
+    def rectangle(self):
+        self._count()
+        return self._rect
+
+    def class_name(self):
+        self._count()
+        return self._class_name
+
+    def automation_id(self):
+        self._count()
+        return self._automation_id
+
+    def is_visible(self):
+        self._count()
+        return self._visible
+
+    def children(self, control_type=None, title=None):
+        self._count()
+        return [child for child in self._children
+                if (control_type is None or child._control_type == control_type)
+                and (title is None or child._text == title)]
+
+def build_chat_list(lines, counter=None, item_height=40, width=600):
+    """把消息行构造成类似微信消息列表的假元素树
+
+    时间戳和系统消息各占一个 ListItem；普通消息的 ListItem 内含发言者按钮和内容文本，
+    因此按先序提取文本可以还原原始的消息行。
+    """
+    items = []
+    pending_sender = None
+    for line in lines:
+        top = len(items) * item_height
+        rect = (0, top, width, top + item_height)
+        if is_timestamp(line) or is_system_message(line):
+            items.append(FakeElement(line, "ListItem", rect, counter=counter))
+        elif pending_sender is None:
+            pending_sender = line
+            continue
+        else:
+            items.append(FakeElement("", "ListItem", rect, "mmui::ChatTextItemView", counter=counter, children=[
+                FakeElement(pending_sender, "Button", rect, counter=counter),
+                FakeElement(line, "Text", rect, counter=counter)]))
+            pending_sender = None
+    bottom = len(items) * item_height
+    return FakeElement("消息", "List", (0, 0, width, bottom), counter=counter, children=items)
@@ -0,0 +1,44 @@
+import json
+import logging
+import os
+from contextlib import contextmanager
+
+@contextmanager
+def profiling(profile_path=None, trace_memory=False, stats=None):
+    """可选地用 cProfile 记录调用耗时、用 tracemalloc 记录内存分配
+
+    profile_path 为 None 且 trace_memory 为 False 时不做任何事，生产运行没有额外开销。
+    """
+    profiler = None
+    if profile_path:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    if trace_memory:
+        import tracemalloc
+        tracemalloc.start()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+            logging.info(f"Profile written to {profile_path} (view with: python -m pstats {profile_path})")
+        if trace_memory:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            logging.info(f"Peak traced memory: {peak / 1024 / 1024:.1f} MiB")
+            for statistic in snapshot.statistics("lineno")[:10]:
+                logging.info(f"  {statistic}")
+            if stats is not None:
+                stats.count("peak_memory_bytes", peak)
+
+def write_run_summary(path, stats, **extra):
+    """把一次运行的阶段耗时、计数和附加信息写成 JSON"""
+    summary = dict(extra)
+    summary.update(stats.to_dict())
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    logging.info(f"Run summary written to {path}")
@@ -0,0 +1,48 @@
+import logging
+from message_types import text_hash
+
+def item_key(item):
+    """ListItem 的稳定标识：优先使用 UIA runtime id，否则使用尺寸和文本哈希
+
+    滚动时控件的纵坐标会变化，所以位置只取左右边界和高度。
+    文本哈希包含 ListItem 名称和所有子孙元素的文本（其中有发言者按钮），
+    不同人发的同样内容（例如接龙的“+1”）高度相同也不会被当成同一项。
+    """
+    try:
+        runtime_id = item.element_info.runtime_id
+        if runtime_id:
+            return ("rid",) + tuple(runtime_id)
+    except Exception:
+        pass
+    rect = item.rectangle()
+    texts = [item.window_text()]
+    texts.extend(element.window_text() for element in item.descendants())
+    text = "\x1f".join(texts)
+    return ("rect", rect.left, rect.right, rect.bottom - rect.top, text_hash(text))
+
+class ItemTracker:
+    """记录已经捕获过的 ListItem，每次滚动只返回新加载的项"""
+
+    def __init__(self):
+        self.seen = set()
+        self.captured_per_scroll = []
+
+    def new_items(self, items):
+        """过滤出未捕获过的 ListItem，并记录本次捕获的数量"""
+        fresh = []
+        for item in items:
+            try:
+                key = item_key(item)
+            except Exception as e:
+                logging.error(f"Error getting list item key: {str(e)}")
+                fresh.append(item)
+                continue
+            if key not in self.seen:
+                self.seen.add(key)
+                fresh.append(item)
+        self.captured_per_scroll.append(len(fresh))
+        return fresh
+
+    @property
+    def total(self):
+        return sum(self.captured_per_scroll)
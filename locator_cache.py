@@ -0,0 +1,123 @@
+import json
+import logging
+import os
+
+# 消息列表的定位策略，按首次发现时的默认顺序排列
+STRATEGIES = ("title", "visible_list")
+
+def window_wrapper(window):
+    """把窗口规格解析为包装对象，避免逐层访问时每次重新查找窗口"""
+    return window.wrapper_object() if hasattr(window, "wrapper_object") else window
+
+def element_path(window, element):
+    """从主窗口到元素的子元素序号路径，找不到时返回 None"""
+    window = window_wrapper(window)
+    path = []
+    node = element
+    while node != window:
+        parent = node.parent()
+        if parent is None:
+            return None
+        path.append(parent.children().index(node))
+        node = parent
+    path.reverse()
+    return path
+
+def element_at_path(window, path):
+    """按序号路径逐层取子元素"""
+    node = window_wrapper(window)
+    for index in path:
+        children = node.children()
+        if index >= len(children):
+            return None
+        node = children[index]
+    return node
+
+class LocatorCache:
+    """消息列表控件定位结果的磁盘缓存
+
+    记录上次成功的定位策略以及控件的 automation id、类名和子元素路径。
+    下次运行时先用 automation id（没有时用路径）直接取回控件，类名、控件类型和可见性都吻合才使用；
+    任一项不符即认为微信界面布局已变化，清除缓存并重新查找，查找时优先尝试上次成功的策略。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entry = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.error(f"Error loading locator cache {self.path}: {str(e)}")
+            return None
+
+    def strategies(self):
+        """查找顺序：上次成功的策略排在最前"""
+        preferred = self.entry.get("strategy") if self.entry else None
+        if preferred in STRATEGIES:
+            return (preferred,) + tuple(s for s in STRATEGIES if s != preferred)
+        return STRATEGIES
+
+    def resolve(self, window):
+        """用缓存的定位信息取回消息列表，校验失败时使缓存失效并返回 None"""
+        entry = self.entry
+        if not entry or not (entry.get("automation_id") or entry.get("path")):
+            return None
+        try:
+            if entry.get("automation_id"):
+                spec = window.child_window(auto_id=entry["automation_id"], control_type="List")
+                element = spec.wrapper_object() if spec.exists(timeout=0) else None
+            else:
+                element = element_at_path(window, entry["path"])
+            if element is not None and self._matches(element):
+                return element
+        except Exception as e:
+            logging.debug(f"Cached chat list locator failed: {str(e)}")
+        logging.info("Cached chat list locator is stale, searching again")
+        self.invalidate()
+        return None
+
+    def _matches(self, element):
+        entry = self.entry
+        return (element.element_info.control_type == "List"
+                and element.element_info.class_name == entry.get("class_name", "")
+                and element.is_visible())
+
+    def record(self, window, element, strategy):
+        """记录本次成功的定位结果"""
+        try:
+            info = element.element_info
+            entry = {
+                "strategy": strategy,
+                "automation_id": info.automation_id or "",
+                "class_name": info.class_name or "",
+                "path": element_path(window, element),
+            }
+        except Exception as e:
+            logging.error(f"Error recording chat list locator: {str(e)}")
+            return
+        self._save(entry)
+
+    def invalidate(self):
+        """清除缓存的控件信息，只保留上次成功的策略用于排序"""
+        strategy = self.entry.get("strategy") if self.entry else None
+        self._save({"strategy": strategy} if strategy else None)
+
+    def _save(self, entry):
+        """原子地写入缓存文件，entry 为 None 时删除文件"""
+        self.entry = entry
+        if entry is None:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
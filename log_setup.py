@@ -0,0 +1,155 @@
+import logging
+import os
+import queue
+import sys
+import threading
+
+# 比 DEBUG 更详细的逐条消息跟踪级别
+TRACE = 5
+logging.addLevelName(TRACE, "TRACE")
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+class QueuedStdout:
+    """替代 sys.stdout：write 只把文本放入内存队列
+
+    后台线程成批取出文本，写到控制台和带缓冲的运行日志文件，每批只刷新一次控制台。
+    """
+
+    def __init__(self, console, run_log=None, buffer_size=1 << 16):
+        self.console = console
+        self._file = open(run_log, 'w', encoding='utf-8', buffering=buffer_size) if run_log else None
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._drain, name="stdout-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, text):
+        self._queue.put(text)
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def sync(self):
+        """等待队列中已有的文本写出，并把运行日志文件的缓冲写盘"""
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def _drain(self):
+        stopping = False
+        while not stopping:
+            chunks = [self._queue.get()]
+            # 把队列中已有的文本一起取出，合并成一次写入
+            while True:
+                try:
+                    chunks.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in chunks:
+                stopping = True
+                chunks = chunks[:chunks.index(None)]
+            # sync 放入的事件：写完这一批后刷新文件再通知
+            events = [chunk for chunk in chunks if isinstance(chunk, threading.Event)]
+            if events:
+                chunks = [chunk for chunk in chunks if not isinstance(chunk, threading.Event)]
+            text = "".join(chunks)
+            if text:
+                try:
+                    self.console.write(text)
+                    self.console.flush()
+                except Exception:
+                    pass
+                if self._file is not None:
+                    self._file.write(text)
+            if events:
+                if self._file is not None:
+                    self._file.flush()
+                for event in events:
+                    event.set()
+
+    def close(self):
+        """写完队列中剩余的文本并关闭运行日志文件"""
+        self._queue.put(None)
+        self._thread.join()
+        if self._file is not None:
+            self._file.close()
+
+class LoggingPipeline:
+    """基于队列的日志管道
+
+    调用方只把记录放入内存队列；格式化、写控制台和写文件都在 QueueListener 的后台线程中完成。
+    文件输出经 MemoryHandler 缓冲，攒够 buffer_records 条或遇到 ERROR 才写盘，主日志按大小轮转；
+    常驻模式每次运行结束调用 flush 写盘。
+    print 的输出不构造日志记录，由 QueuedStdout 原样写到控制台和本次运行的日志文件。
+    """
+
+    def __init__(self, log_path, level=logging.INFO, run_log=None, max_bytes=10 * 1024 * 1024,
+                 backup_count=5, buffer_records=200):
+        # logging.handlers 会连带导入 socket 等模块，只在真正配置日志时导入
+        import logging.handlers
+        os.makedirs(log_path, exist_ok=True)
+        self.console = sys.stdout
+        self.run_log = run_log
+        self.stdout = None
+
+        main_file = logging.handlers.RotatingFileHandler(os.path.join(log_path, 'wechat_exporter.log'),
+                                                         maxBytes=max_bytes, backupCount=backup_count,
+                                                         encoding='utf-8')
+        main_file.setFormatter(logging.Formatter(LOG_FORMAT))
+        stderr = logging.StreamHandler(sys.stderr)
+        stderr.setFormatter(logging.Formatter(LOG_FORMAT))
+        self._handlers = [logging.handlers.MemoryHandler(buffer_records, flushLevel=logging.ERROR,
+                                                         target=main_file),
+                          stderr]
+        log_queue = queue.SimpleQueue()
+        self._listener = logging.handlers.QueueListener(log_queue, *self._handlers)
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(logging.handlers.QueueHandler(log_queue))
+        root.setLevel(level)
+
+    def start(self):
+        """启动后台写出线程，并把 print 输出接入队列"""
+        self._listener.start()
+        self.stdout = QueuedStdout(self.console, self.run_log)
+        sys.stdout = self.stdout
+        return self
+
+    def flush(self):
+        """把已经产生的日志和 print 输出全部写盘"""
+        if self.stdout is not None:
+            self.stdout.sync()
+        # 停止监听线程会先处理完队列中已有的记录，写盘后再重新启动
+        self._listener.stop()
+        try:
+            for handler in self._handlers:
+                handler.flush()
+                target = getattr(handler, "target", None)
+                if target is not None:
+                    target.flush()
+        finally:
+            self._listener.start()
+
+    def stop(self):
+        """恢复标准输出，写完队列中剩余的内容并关闭文件"""
+        if self.stdout is not None:
+            sys.stdout = self.console
+            self.stdout.close()
+            self.stdout = None
+        self._listener.stop()
+        for handler in self._handlers:
+            # MemoryHandler 关闭时会先写出缓冲并丢弃 target，需要先取出再关闭
+            target = getattr(handler, "target", None)
+            handler.close()
+            if target is not None:
+                target.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
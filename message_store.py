@@ -0,0 +1,143 @@
+import argparse
+import datetime
+import os
+import sys
+from export_writer import MarkdownExportWriter
+from message_types import Message, message_hash
+from timestamps import from_epoch, to_epoch
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    group_name   TEXT    NOT NULL,
+    ts           INTEGER NOT NULL,
+    content_hash INTEGER NOT NULL,
+    kind         TEXT    NOT NULL,
+    sender       TEXT,
+    content      TEXT    NOT NULL,
+    idx          INTEGER,
+    PRIMARY KEY (group_name, ts, content_hash)
+);
+CREATE INDEX IF NOT EXISTS idx_messages_group_ts ON messages (group_name, ts);
+CREATE INDEX IF NOT EXISTS idx_messages_group_sender ON messages (group_name, sender);
+"""
+
+class MessageStore:
+    """SQLite 消息库
+
+    消息按 (群聊, 时间, 内容哈希) 唯一，重复导出同一段消息不会产生重复记录。
+    写入按批次放在同一个事务中，查询走 (群聊, 时间) 和 (群聊, 发言者) 索引。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # 只有真正打开消息库时才导入 sqlite3，解析命令行参数不需要它
+        import sqlite3
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.inserted = 0
+
+    def insert_batch(self, group, messages):
+        """在一个事务中写入一批消息，返回新插入的条数"""
+        rows = [(group, to_epoch(m.timestamp), message_hash(m), m.kind, m.sender, m.content, m.index)
+                for m in messages]
+        if not rows:
+            return 0
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO messages (group_name, ts, content_hash, kind, sender, content, idx) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            inserted = self.conn.total_changes - before
+        self.inserted += inserted
+        return inserted
+
+    def tee(self, messages, group, batch_size=500):
+        """按批写入消息库后原样产出消息"""
+        batch = []
+        for message in messages:
+            batch.append(message)
+            if len(batch) >= batch_size:
+                self.insert_batch(group, batch)
+                batch = []
+            yield message
+        self.insert_batch(group, batch)
+
+    def query(self, group, start_time=None, end_time=None, sender=None):
+        """按时间范围和发言者查询消息，按时间和写入顺序返回 Message 流"""
+        sql = "SELECT ts, kind, sender, content, idx FROM messages WHERE group_name = ?"
+        params = [group]
+        if start_time is not None:
+            sql += " AND ts >= ?"
+            params.append(to_epoch(start_time))
+        if end_time is not None:
+            sql += " AND ts <= ?"
+            params.append(to_epoch(end_time))
+        if sender is not None:
+            sql += " AND sender = ?"
+            params.append(sender)
+        sql += " ORDER BY ts, rowid"
+        for ts, kind, sender_name, content, idx in self.conn.execute(sql, params):
+            yield Message(kind, content, from_epoch(ts), sender_name, idx)
+
+    def groups(self):
+        """库中已有的群聊及消息数"""
+        return self.conn.execute(
+            "SELECT group_name, COUNT(*) FROM messages GROUP BY group_name ORDER BY group_name").fetchall()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+def parse_time(value):
+    """解析命令行中的时间参数"""
+    return datetime.datetime.strptime(value, "%Y-%m-%d %H:%M:%S") if value else None
+
+def run_query(args):
+    """执行查询并输出 Markdown"""
+    start_time = parse_time(args.start)
+    end_time = parse_time(args.end)
+    with MessageStore(args.db) as store:
+        if not args.group:
+            for group, count in store.groups():
+                print(f"{group}\t{count}")
+            return 0
+
+        messages = store.query(args.group, start_time, end_time, args.sender)
+        if args.output:
+            with MarkdownExportWriter(args.output, args.group, datetime.datetime.now(),
+                                      start_time=args.start, end_time=args.end) as writer:
+                writer.write_all(messages)
+            print(f"Exported {writer.count} messages to {args.output}", file=sys.stderr)
+        else:
+            for message in messages:
+                for line in message.lines():
+                    print(line)
+    return 0
+
+def add_query_arguments(parser, default_db):
+    """注册查询命令的参数"""
+    parser.add_argument("--db", default=default_db, help="SQLite database path")
+    parser.add_argument("--group", help="group to query; omit to list stored groups")
+    parser.add_argument("--start", help="start time, YYYY-MM-DD HH:MM:SS")
+    parser.add_argument("--end", help="end time, YYYY-MM-DD HH:MM:SS")
+    parser.add_argument("--sender", help="only messages from this sender")
+    parser.add_argument("--output", help="write Markdown to this file instead of stdout")
+
+def main():
+    import config
+
+    parser = argparse.ArgumentParser(description="Query the WeChat message store")
+    add_query_arguments(parser, config.SQLITE_PATH)
+    return run_query(parser.parse_args())
+
+if __name__ == "__main__":
+    sys.exit(main())
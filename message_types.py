@@ -0,0 +1,103 @@
+import hashlib
+import sys
+from timestamps import classify_timestamp, is_timestamp
+
+# 系统消息关键字
+SYSTEM_MESSAGES = ("消息", "查看更多消息", "[图片]", "撤回了一条消息")
+
+# 消息类型
+TIMESTAMP = "timestamp"
+SYSTEM = "system"
+TEXT = "text"
+
+def is_system_message(text):
+    """检查是否是系统消息"""
+    return any(msg in text for msg in SYSTEM_MESSAGES)
+
+def text_hash(text):
+    """跨进程稳定的 63 位文本哈希（可直接存入 SQLite INTEGER）"""
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'big') >> 1
+
+def message_hash(message):
+    """Message 记录的稳定内容哈希，由类型、发言者和内容决定"""
+    return text_hash(f"{message.kind}\x1f{message.sender or ''}\x1f{message.content}")
+
+class Message:
+    """一条聊天记录
+
+    timestamp 是消息所在时间段的时间（时间戳消息为其自身的时间），
+    index 是消息在消息列表中的 ListItem 序号。发言者名称经过 intern，
+    同一发言者的所有消息共享同一个字符串对象。
+    """
+
+    __slots__ = ("timestamp", "sender", "kind", "content", "index")
+
+    def __init__(self, kind, content, timestamp=None, sender=None, index=None):
+        self.kind = kind
+        self.content = content
+        self.timestamp = timestamp
+        self.sender = sys.intern(sender) if sender else None
+        self.index = index
+
+    def lines(self):
+        """渲染为导出文件中的文本行"""
+        if self.kind == TEXT and self.sender:
+            return (self.sender, self.content)
+        return (self.content,)
+
+    def __repr__(self):
+        return (f"Message(kind={self.kind!r}, content={self.content!r}, timestamp={self.timestamp!r}, "
+                f"sender={self.sender!r}, index={self.index!r})")
+
+    def __eq__(self, other):
+        if not isinstance(other, Message):
+            return NotImplemented
+        return (self.kind, self.content, self.timestamp, self.sender, self.index) == \
+               (other.kind, other.content, other.timestamp, other.sender, other.index)
+
+class MessageBuilder:
+    """把消息列表中每个 ListItem 的文本构造成 Message，并跟踪当前所在的时间段
+
+    “昨天”、星期和只有时刻的时间戳相对于 now 解析，默认为当前时间；离线处理时传入采集时间。
+    """
+
+    def __init__(self, now=None):
+        self.now = now
+        self.current_time = None
+
+    def build(self, index, item_text, parts):
+        """parts 为 ListItem 子孙元素的 (控件类型, 文本) 列表，返回 Message 或 None"""
+        texts = [text for text in [item_text] + [text for _, text in parts] if text and text.strip()]
+        if not texts:
+            return None
+
+        # 发言者是头像按钮的名称，内容优先取 ListItem 自身的名称
+        sender = next((text for control_type, text in parts
+                       if control_type == "Button" and text and text.strip()), None)
+
+        # 时间戳只有一段文本（ListItem 名称和子元素可能重复同一文本），有发言者时是消息内容，即使形如时间
+        if sender is None and len(set(texts)) == 1:
+            parsed = classify_timestamp(texts[0], self.now)
+            if parsed:
+                self.current_time = parsed.time
+                return Message(TIMESTAMP, texts[0], parsed.time, index=index)
+
+        if sender is None and is_system_message(texts[0]):
+            return Message(SYSTEM, texts[0], self.current_time, index=index)
+
+        if item_text and item_text.strip():
+            content = item_text
+        else:
+            rest = [text for text in texts if text != sender]
+            if sender is None and len(rest) > 1:
+                # 没有按钮时按“发言者、内容”的顺序理解
+                sender, rest = rest[0], rest[1:]
+            content = rest[0] if rest else ""
+        # 没有文本内容的项（例如只有头像按钮）不构成消息
+        if not content.strip():
+            return None
+        return Message(TEXT, content, self.current_time, sender, index)
+
+    def from_text(self, text, index=None):
+        """从单行文本构造 Message（没有发言者信息）"""
+        return self.build(index, text, [])
@@ -0,0 +1,88 @@
+import datetime
+import glob
+import gzip
+import json
+import logging
+import os
+import zlib
+
+# 采集文件格式版本
+CAPTURE_VERSION = 1
+
+def capture_dir(export_path):
+    return os.path.join(export_path, ".captures")
+
+def capture_path(export_path, group, run_id):
+    """单次运行中一个群聊的采集文件路径"""
+    return os.path.join(capture_dir(export_path), f"{group}_{run_id}.jsonl.gz")
+
+def find_captures(export_path, groups=None):
+    """按文件名（群名和运行时间）排序列出采集文件，可只列出指定群聊的"""
+    paths = sorted(glob.glob(os.path.join(glob.escape(capture_dir(export_path)), "*.jsonl.gz")))
+    if groups:
+        paths = [path for path in paths if read_header(path).get("group") in groups]
+    return paths
+
+class RawCapture:
+    """把界面采集到的原始 ListItem 追加写入 gzip 压缩的 JSON Lines 文件
+
+    第一行是文件头（版本、群名、采集时间），之后每行一个 [序号, 自身文本, [[控件类型, 文本], ...]]。
+    以追加模式打开，同一文件多次写入会形成多段 gzip，读取时按顺序连起来。
+    """
+
+    def __init__(self, path, group, compresslevel=6):
+        self.path = path
+        self.count = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        is_new = not os.path.exists(path)
+        self._file = gzip.open(path, 'at', encoding='utf-8', compresslevel=compresslevel)
+        if is_new:
+            self._write({"version": CAPTURE_VERSION, "group": group,
+                         "captured_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")})
+
+    def _write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    def tee(self, raw_items):
+        """原样产出原始 ListItem 流，同时写入采集文件"""
+        for item in raw_items:
+            self._write(item)
+            self.count += 1
+            yield item
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+def _iter_records(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        try:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        except (EOFError, zlib.error, gzip.BadGzipFile) as e:
+            # 进程中途退出时最后一段 gzip 不完整，保留之前的内容
+            logging.warning(f"Capture {path} is truncated: {str(e)}")
+
+def read_header(path):
+    """读取采集文件头"""
+    for record in _iter_records(path):
+        if record.get("version") != CAPTURE_VERSION:
+            raise Exception(f"Unsupported capture version {record.get('version')} in {path}")
+        return record
+    return {}
+
+def iter_capture(path):
+    """流式读取采集文件，逐条产出 (序号, 自身文本, 子孙元素的 (控件类型, 文本) 列表)"""
+    records = _iter_records(path)
+    next(records, None)
+    for index, item_text, parts in records:
+        yield index, item_text, parts
@@ -0,0 +1,137 @@
+import argparse
+import gzip
+import json
+import sys
+from tree_walker import TreeWalker
+
+# 记录类型：控件类型字典、类名字典、元素
+CONTROL_TYPE = "ct"
+CLASS_NAME = "cls"
+ELEMENT = "e"
+NO_CODE = -1
+
+def _open(path, mode):
+    """路径以 .gz 结尾时使用 gzip"""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+class StructureDumpWriter:
+    """逐个元素写出的 NDJSON 结构转储
+
+    每行一条记录。元素记录包含 id、父元素 id、深度、控件类型编码、类名编码、文本、矩形和 automation id，
+    控件类型和类名第一次出现时先写一条字典记录，之后只写编码。
+    """
+
+    def __init__(self, path, max_depth=None):
+        self.path = path
+        self.max_depth = max_depth
+        self.count = 0
+        self._codes = {CONTROL_TYPE: {}, CLASS_NAME: {}}
+        self._file = _open(path, 'w')
+
+    def _code(self, table, value):
+        codes = self._codes[table]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(codes)
+            self._write({"t": table, "i": code, "v": value})
+        return code
+
+    def _write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    def write_tree(self, root, backend=None):
+        """遍历并写出一棵子树，根元素的父 id 为 -1，返回写出的元素数"""
+        walker = TreeWalker(backend, max_depth=self.max_depth)
+        parents = []
+        written = 0
+        for depth, node in walker.walk(root):
+            backend = walker.backend
+            try:
+                control_type = backend.control_type(node)
+            except Exception:
+                control_type = "Unknown"
+            try:
+                text = backend.window_text(node)
+            except Exception:
+                text = ""
+            try:
+                rect = list(backend.rectangle(node))
+            except Exception:
+                rect = None
+            try:
+                class_name = backend.class_name(node)
+                automation_id = backend.automation_id(node)
+            except Exception:
+                class_name, automation_id = "", ""
+
+            # parents 保存当前路径上各层祖先的 id
+            del parents[depth:]
+            record = {"t": ELEMENT, "id": self.count, "p": parents[-1] if parents else -1, "d": depth,
+                      "c": self._code(CONTROL_TYPE, control_type),
+                      "k": self._code(CLASS_NAME, class_name) if class_name else NO_CODE,
+                      "x": text, "r": rect}
+            if automation_id:
+                record["a"] = automation_id
+            self._write(record)
+            parents.append(self.count)
+            self.count += 1
+            written += 1
+        return written
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+def iter_elements(path):
+    """流式读取结构转储，逐个产出解码后的元素 dict"""
+    names = {CONTROL_TYPE: {}, CLASS_NAME: {}}
+    with _open(path, 'r') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            kind = record["t"]
+            if kind == ELEMENT:
+                code = record.get("k", NO_CODE)
+                yield {"id": record["id"], "parent": record["p"], "depth": record["d"],
+                       "control_type": names[CONTROL_TYPE][record["c"]],
+                       "class_name": names[CLASS_NAME][code] if code != NO_CODE else "",
+                       "automation_id": record.get("a", ""), "text": record["x"], "rect": record["r"]}
+            else:
+                names[kind][record["i"]] = record["v"]
+
+def render_text(path):
+    """把结构转储渲染为原来的缩进文本格式，逐行产出"""
+    for element in iter_elements(path):
+        indent = '|    ' * element["depth"]
+        rect = element["rect"]
+        rect_str = f"({rect[0]}, {rect[1]}, {rect[2]}, {rect[3]})" if rect else "(Unknown position)"
+        yield f"{indent}{element['control_type']} - '{element['text']}'    {rect_str}"
+        if element["class_name"] or element["automation_id"]:
+            yield f"{indent}['{element['class_name']}', '{element['automation_id']}']"
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a structure dump in the indented text layout")
+    parser.add_argument("dump", help="structure dump (.ndjson or .ndjson.gz)")
+    parser.add_argument("--output", help="write to this file instead of stdout")
+    args = parser.parse_args()
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        for line in render_text(args.dump):
+            out.write(line + "\n")
+    finally:
+        if args.output:
+            out.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
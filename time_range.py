@@ -0,0 +1,59 @@
+from bisect import bisect_left, bisect_right
+from itertools import islice
+from message_types import TIMESTAMP
+
+class TimeRange:
+    """按时间范围成批筛选 Message 记录流
+
+    时间范围只解析一次。每一批消息按时间戳消息切成时间段，取出各时间段的时间；
+    时间有序时用 bisect 找出范围内连续的时间段，一次切片取出，否则逐段比较。
+    时间段整体保留或整体丢弃，范围外时间戳下面的消息不会漏出；第一条时间戳之前（时间未知）的消息保留。
+    """
+
+    def __init__(self, start_time=None, end_time=None, batch_size=1000):
+        self.start_time = start_time
+        self.end_time = end_time
+        self.batch_size = max(1, batch_size)
+
+    def contains(self, value):
+        """时间是否在范围内，None 表示时间未知，视为在范围内"""
+        if value is None:
+            return True
+        return ((self.start_time is None or value >= self.start_time)
+                and (self.end_time is None or value <= self.end_time))
+
+    def select(self, batch):
+        """从一批消息中选出范围内的时间段，返回 (起, 止) 下标区间的列表"""
+        starts = [i for i, msg in enumerate(batch) if msg.kind == TIMESTAMP]
+        times = [batch[i].timestamp for i in starts]
+
+        spans = []
+        # 批首的消息属于上一批延续下来的时间段，它们的 timestamp 就是该时间段的时间
+        head = starts[0] if starts else len(batch)
+        if head and self.contains(batch[0].timestamp):
+            spans.append((0, head))
+        if not starts:
+            return spans
+        starts.append(len(batch))
+
+        if times == sorted(times):
+            lo = 0 if self.start_time is None else bisect_left(times, self.start_time)
+            hi = len(times) if self.end_time is None else bisect_right(times, self.end_time)
+            if lo < hi:
+                spans.append((starts[lo], starts[hi]))
+        else:
+            contains = self.contains
+            for block, value in enumerate(times):
+                if contains(value):
+                    spans.append((starts[block], starts[block + 1]))
+        return spans
+
+    def filter(self, messages):
+        """逐批筛选消息流，保持原有顺序"""
+        iterator = iter(messages)
+        while True:
+            batch = list(islice(iterator, self.batch_size))
+            if not batch:
+                return
+            for start, end in self.select(batch):
+                yield from batch[start:end]
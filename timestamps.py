@@ -0,0 +1,75 @@
+import datetime
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# 时间戳类型
+FULL_DATE = "full"
+YESTERDAY = "yesterday"
+WEEKDAY = "weekday"
+TIME_ONLY = "time"
+
+WEEKDAYS = {"一": 0, "二": 1, "三": 2, "四": 3, "五": 4, "六": 5, "日": 6, "天": 6}
+
+# 合并后的时间戳格式，一次匹配即可完成分类和解析：
+#   2025年4月10日 20:44 / 昨天 20:44 / 星期三 20:44 / 20:44
+TIMESTAMP_PATTERN = re.compile(
+    r'(?:(?P<year>\d{4})年(?P<month>\d{1,2})月(?P<day>\d{1,2})日 '
+    r'|(?P<yesterday>昨天) '
+    r'|星期(?P<weekday>[一二三四五六日天]) )?'
+    r'(?P<hour>\d{1,2}):(?P<minute>\d{2})\s*$'
+)
+
+ParsedTimestamp = namedtuple("ParsedTimestamp", ["kind", "time"])
+
+def is_timestamp(text):
+    """检查文本是否是时间戳"""
+    return TIMESTAMP_PATTERN.match(text) is not None
+
+@lru_cache(maxsize=4096)
+def _classify(text, today):
+    """按文本和当天日期缓存解析结果"""
+    match = TIMESTAMP_PATTERN.match(text)
+    if match is None:
+        return None
+
+    year, month, day, yesterday, weekday, hour, minute = match.groups()
+    try:
+        if year:
+            kind = FULL_DATE
+            date = datetime.date(int(year), int(month), int(day))
+        elif yesterday:
+            kind = YESTERDAY
+            date = today - datetime.timedelta(days=1)
+        elif weekday:
+            # 微信对一周内的消息显示星期，取今天之前最近的那一天
+            kind = WEEKDAY
+            days_back = (today.weekday() - WEEKDAYS[weekday]) % 7 or 7
+            date = today - datetime.timedelta(days=days_back)
+        else:
+            kind = TIME_ONLY
+            date = today
+        return ParsedTimestamp(kind, datetime.datetime(date.year, date.month, date.day, int(hour), int(minute)))
+    except ValueError:
+        return None
+
+def classify_timestamp(text, now=None):
+    """一次匹配完成时间戳分类和解析，不是时间戳时返回 None"""
+    today = (now or datetime.datetime.now()).date()
+    return _classify(text, today)
+
+# 不带时区的纪元起点，用于把时间存成 int64 秒数（与本机时区无关）
+EPOCH = datetime.datetime(1970, 1, 1)
+NO_TIME = -(1 << 63)
+
+def to_epoch(value):
+    """把 datetime 转为纪元秒数，None 转为 NO_TIME"""
+    if value is None:
+        return NO_TIME
+    return (value - EPOCH) // datetime.timedelta(seconds=1)
+
+def from_epoch(seconds):
+    """把纪元秒数转回 datetime，NO_TIME 转为 None"""
+    if seconds == NO_TIME:
+        return None
+    return EPOCH + datetime.timedelta(seconds=seconds)
@@ -0,0 +1,138 @@
+import logging
+
+class WrapperBackend:
+    """直接调用 pywinauto 包装对象（或同接口的假元素）的后端，每个属性一次跨进程调用"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def prepare(self, root):
+        return root
+
+    def window_text(self, element):
+        self.calls += 1
+        return element.window_text()
+
+    def control_type(self, element):
+        # 包装对象没有 control_type() 方法，控件类型在 element_info 上
+        self.calls += 1
+        return element.element_info.control_type
+
+    def rectangle(self, element):
+        self.calls += 1
+        rect = element.rectangle()
+        return (rect.left, rect.top, rect.right, rect.bottom)
+
+    def class_name(self, element):
+        self.calls += 1
+        return element.class_name()
+
+    def automation_id(self, element):
+        self.calls += 1
+        return element.automation_id()
+
+    def children(self, element):
+        self.calls += 1
+        return element.children()
+
+class UIACacheBackend:
+    """基于 UIA CacheRequest 的后端
+
+    prepare() 通过一次 BuildUpdatedCache 调用取回整棵子树（children_only 时只取直接子元素）
+    及常用属性，之后的属性读取和子元素遍历都只访问本地缓存，calls 只统计 prepare()。
+    """
+
+    def __init__(self, children_only=False):
+        self.calls = 0
+        from pywinauto.uia_defines import IUIA
+        self._iuia = IUIA()
+        uia = self._iuia.UIA_dll
+        cache = self._iuia.iuia.CreateCacheRequest()
+        for property_id in (uia.UIA_NamePropertyId,
+                            uia.UIA_ControlTypePropertyId,
+                            uia.UIA_BoundingRectanglePropertyId,
+                            uia.UIA_ClassNamePropertyId,
+                            uia.UIA_AutomationIdPropertyId):
+            cache.AddProperty(property_id)
+        tree_scope = self._iuia.tree_scope
+        if children_only:
+            cache.TreeScope = tree_scope["element"] | tree_scope["children"]
+        else:
+            cache.TreeScope = tree_scope["subtree"]
+        cache.TreeFilter = self._iuia.true_condition
+        cache.AutomationElementMode = uia.AutomationElementMode_None
+        self._cache_request = cache
+
+    def prepare(self, root):
+        self.calls += 1
+        return root.element_info.element.BuildUpdatedCache(self._cache_request)
+
+    def window_text(self, element):
+        return element.CachedName or ""
+
+    def control_type(self, element):
+        return self._iuia.known_control_type_ids.get(element.CachedControlType, "Unknown")
+
+    def rectangle(self, element):
+        rect = element.CachedBoundingRectangle
+        return (rect.left, rect.top, rect.right, rect.bottom)
+
+    def class_name(self, element):
+        return element.CachedClassName or ""
+
+    def automation_id(self, element):
+        return element.CachedAutomationId or ""
+
+    def children(self, element):
+        cached = element.GetCachedChildren()
+        if not cached:
+            return []
+        return [cached.GetElement(i) for i in range(cached.Length)]
+
+def default_backend(root, use_cache=True, children_only=False):
+    """为根元素选择后端：UIA 元素优先使用缓存请求，否则直接调用包装对象"""
+    if use_cache and hasattr(root, "element_info") and hasattr(root.element_info, "element"):
+        try:
+            return UIACacheBackend(children_only=children_only)
+        except Exception as e:
+            logging.debug(f"UIA cache request unavailable, falling back to wrapper calls: {str(e)}")
+    return WrapperBackend()
+
+class TreeWalker:
+    """使用显式栈迭代遍历元素树，支持深度限制"""
+
+    def __init__(self, backend=None, max_depth=None):
+        self.backend = backend
+        self.max_depth = max_depth
+
+    def walk(self, root):
+        """按先序遍历，产出 (深度, 元素)"""
+        backend = self.backend or default_backend(root, children_only=self.max_depth == 1)
+        self.backend = backend
+        max_depth = self.max_depth
+        stack = [(0, backend.prepare(root))]
+        while stack:
+            depth, element = stack.pop()
+            yield depth, element
+
+            if max_depth is not None and depth >= max_depth:
+                continue
+            try:
+                children = backend.children(element)
+            except Exception as e:
+                logging.error(f"Error getting children: {str(e)}")
+                continue
+            # 逆序入栈以保持先序顺序
+            for child in reversed(children):
+                stack.append((depth + 1, child))
+
+    def iter_texts(self, root):
+        """逐条产出非空文本"""
+        for _, element in self.walk(root):
+            try:
+                text = self.backend.window_text(element)
+            except Exception as e:
+                logging.error(f"Error extracting text content: {str(e)}")
+                continue
+            if text and text.strip():
+                yield text
@@ -0,0 +1,102 @@
+import gzip
+import json
+from fake_tree import FakeElement
+from message_types import is_timestamp, is_system_message
+from tree_walker import TreeWalker
+
+# 快照格式版本
+SNAPSHOT_VERSION = 1
+
+def capture_snapshot(root, backend=None):
+    """把元素树序列化为嵌套的 dict：文本、控件类型、矩形、类名、automation id 和子元素
+
+    空的类名、automation id 和子元素列表省略不写。
+    """
+    walker = TreeWalker(backend)
+    stack = []
+    tree = None
+    for depth, element in walker.walk(root):
+        backend = walker.backend
+        node = {"text": backend.window_text(element), "type": backend.control_type(element),
+                "rect": list(backend.rectangle(element))}
+        class_name = backend.class_name(element)
+        if class_name:
+            node["class"] = class_name
+        automation_id = backend.automation_id(element)
+        if automation_id:
+            node["id"] = automation_id
+
+        # 栈中保存当前路径上的祖先节点
+        del stack[depth:]
+        if stack:
+            stack[-1].setdefault("children", []).append(node)
+        else:
+            tree = node
+        stack.append(node)
+    return tree
+
+def save_snapshot(tree, path):
+    """写入快照文件，路径以 .gz 结尾时 gzip 压缩"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, 'wt', encoding='utf-8') as f:
+        json.dump({"version": SNAPSHOT_VERSION, "root": tree}, f, ensure_ascii=False, separators=(",", ":"))
+
+def load_snapshot(path):
+    """读取快照文件，返回根节点"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get("version") != SNAPSHOT_VERSION:
+        raise Exception(f"Unsupported snapshot version {data.get('version')} in {path}")
+    return data["root"]
+
+class SnapshotBackend:
+    """直接在快照 dict 上遍历的回放后端，接口与 tree_walker 中的后端一致"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def prepare(self, root):
+        return root
+
+    def window_text(self, node):
+        return node["text"]
+
+    def control_type(self, node):
+        return node["type"]
+
+    def rectangle(self, node):
+        return tuple(node["rect"])
+
+    def class_name(self, node):
+        return node.get("class", "")
+
+    def automation_id(self, node):
+        return node.get("id", "")
+
+    def children(self, node):
+        return node.get("children", ())
+
+def to_fake_tree(node):
+    """把快照转换为 FakeElement 树，用于需要 pywinauto 包装对象接口的代码"""
+    children = [to_fake_tree(child) for child in node.get("children", ())]
+    return FakeElement(node["text"], node["type"], tuple(node["rect"]), node.get("class", ""),
+                       node.get("id", ""), children)
+
+def synthetic_snapshot(lines, item_height=40, width=600):
+    """把消息行直接构造成消息列表快照，结构与 fake_tree.build_chat_list 相同"""
+    items = []
+    pending_sender = None
+    for line in lines:
+        top = len(items) * item_height
+        rect = [0, top, width, top + item_height]
+        if is_timestamp(line) or is_system_message(line):
+            items.append({"text": line, "type": "ListItem", "rect": rect})
+        elif pending_sender is None:
+            pending_sender = line
+        else:
+            items.append({"text": "", "type": "ListItem", "rect": rect, "class": "mmui::ChatTextItemView",
+                          "children": [{"text": pending_sender, "type": "Button", "rect": rect},
+                                       {"text": line, "type": "Text", "rect": rect}]})
+            pending_sender = None
+    return {"text": "消息", "type": "List", "rect": [0, 0, width, len(items) * item_height], "children": items}
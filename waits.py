@@ -0,0 +1,149 @@
+import logging
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from itertools import islice
+
+# 流水线阶段计时的批大小：每批读一次时钟，而不是每条
+TIMED_BATCH_SIZE = 64
+
+class WaitTimeout(Exception):
+    """等待条件超时"""
+
+class PhaseStats:
+    """按阶段统计总耗时、自身耗时和其中用于等待的时间，以及各类计数"""
+
+    def __init__(self):
+        self.phases = OrderedDict()
+        self.counters = OrderedDict()
+        self._stack = []
+
+    def _entry(self, name):
+        return self.phases.setdefault(name, {"total": 0.0, "self": 0.0, "calls": 0, "wait": 0.0, "waits": 0})
+
+    @contextmanager
+    def phase(self, name):
+        """统计一个阶段的耗时，阶段可以嵌套
+
+        total 包含嵌套的子阶段，self 只计本阶段自身；等待时间计入最内层阶段。
+        """
+        entry = self._entry(name)
+        frame = [name, 0.0]
+        self._stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield entry
+        finally:
+            elapsed = time.perf_counter() - start
+            self._stack.pop()
+            entry["total"] += elapsed
+            entry["self"] += elapsed - frame[1]
+            entry["calls"] += 1
+            if self._stack:
+                self._stack[-1][1] += elapsed
+
+    def timed(self, name, iterable, batch_size=TIMED_BATCH_SIZE):
+        """包装流水线中的一个生成器阶段，每次取一批（最多 batch_size 条）时计入该阶段
+
+        计时按批进行，每批只读两次时钟，耗时先累加在局部变量中，阶段结束（或生成器关闭）时一次写入统计。
+        """
+        entry = self._entry(name)
+        stack = self._stack
+        frame = [name, 0.0]
+        clock = time.perf_counter
+        iterator = iter(iterable)
+        total = 0.0
+        calls = 0
+        try:
+            while True:
+                stack.append(frame)
+                start = clock()
+                try:
+                    batch = list(islice(iterator, batch_size))
+                finally:
+                    elapsed = clock() - start
+                    stack.pop()
+                    total += elapsed
+                    calls += 1
+                    if stack:
+                        stack[-1][1] += elapsed
+                if not batch:
+                    return
+                yield from batch
+        finally:
+            entry["total"] += total
+            entry["self"] += total - frame[1]
+            entry["calls"] += calls
+
+    def count(self, name, n=1):
+        """累加计数器"""
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def merge(self, other):
+        """累加另一个统计对象（例如在其他线程中记录的阶段）"""
+        for name, entry in other.phases.items():
+            target = self._entry(name)
+            for key, value in entry.items():
+                target[key] += value
+        for name, value in other.counters.items():
+            self.count(name, value)
+
+    def add_wait(self, seconds):
+        """把一次等待计入当前阶段"""
+        if not self._stack:
+            return
+        entry = self.phases[self._stack[-1][0]]
+        entry["wait"] += seconds
+        entry["waits"] += 1
+
+    def to_dict(self):
+        """可写入 JSON 的统计结果"""
+        return {
+            "phases": {name: {key: round(value, 6) if isinstance(value, float) else value
+                              for key, value in entry.items()}
+                       for name, entry in self.phases.items()},
+            "counters": dict(self.counters),
+        }
+
+    def log_summary(self):
+        """记录每个阶段的等待时间和工作时间"""
+        for name, entry in self.phases.items():
+            work = max(0.0, entry["self"] - entry["wait"])
+            logging.info(f"Phase {name}: total {entry['total']:.2f}s, self {entry['self']:.2f}s, "
+                         f"waiting {entry['wait']:.2f}s in {entry['waits']} waits, working {work:.2f}s")
+        for name, value in self.counters.items():
+            logging.info(f"Counter {name}: {value}")
+
+def wait_until(condition, timeout=10.0, interval=0.05, max_interval=0.5, backoff=1.5,
+               description="condition", stats=None, raise_on_timeout=True):
+    """轮询条件直到返回真值，轮询间隔按 backoff 递增
+
+    返回条件的最后一次结果。超时时默认抛出 WaitTimeout，raise_on_timeout 为 False 时返回假值。
+    条件抛出的异常视为条件不满足。
+    """
+    start = time.perf_counter()
+    deadline = start + timeout
+    result = None
+    try:
+        while True:
+            try:
+                result = condition()
+            except Exception as e:
+                logging.debug(f"Waiting for {description}: {str(e)}")
+                result = None
+            if result:
+                return result
+
+            now = time.perf_counter()
+            if now >= deadline:
+                if raise_on_timeout:
+                    raise WaitTimeout(f"Timed out after {timeout:.1f}s waiting for {description}")
+                logging.warning(f"Timed out after {timeout:.1f}s waiting for {description}")
+                return result
+            time.sleep(min(interval, deadline - now))
+            interval = min(interval * backoff, max_interval)
+    finally:
+        elapsed = time.perf_counter() - start
+        logging.debug(f"Waited {elapsed:.3f}s for {description}")
+        if stats is not None:
+            stats.add_wait(elapsed)
@@ -1,213 +1,118 @@
 import os
+import sys
 import time
 import datetime
-import schedule
 import argparse
-import sys
-from pywinauto.application import Application
-from pywinauto.keyboard import send_keys
+import importlib
+import functools
 import config
 import logging
-import re
-from tqdm import tqdm
-from pywinauto.mouse import press, release, move
-
-# 配置日志
-logging.basicConfig(
-    level=logging.DEBUG,  # 设置为DEBUG级别以显示所有日志
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(os.path.join(config.LOG_PATH, 'wechat_exporter.log')),
-        logging.StreamHandler()
-    ]
-)
-
-class Logger:
-    def __init__(self, log_file):
-        self.log_file = log_file
-        self.console = sys.stdout
-        self.log = open(log_file, 'w', encoding='utf-8')
-        
-    def write(self, message):
-        self.console.write(message)
-        self.log.write(message)
-        self.log.flush()
-        
-    def close(self):
-        self.log.close()
+from contextlib import ExitStack
+from timestamps import classify_timestamp
+from export_writer import MarkdownExportWriter, DailyMarkdownWriter
+from checkpoint import IncrementalFilter, load_checkpoint, save_checkpoint
+from tree_walker import TreeWalker
+from instrumentation import profiling, write_run_summary
+from log_setup import TRACE
+from dedup import MessageDeduplicator
+from archive import ArchiveWriter
+from worker_pool import WorkerPool, build_messages
+from time_range import TimeRange
+from export_index import ExportIndex
+from raw_capture import RawCapture, capture_path, find_captures, iter_capture, read_header
 
 def get_latest_message_time(messages):
     """从消息列表中获取最新的消息时间"""
     latest_time = None
     for msg in messages:
-        if is_timestamp(msg):
-            try:
-                # 尝试解析完整日期时间
-                date_pattern = r'(\d{4})年(\d{1,2})月(\d{1,2})日 (\d{1,2}):(\d{2})'
-                time_pattern = r'(\d{1,2}):(\d{2})'
-                
-                match = re.search(date_pattern, msg)
-                if match:
-                    year, month, day, hour, minute = map(int, match.groups())
-                    msg_time = datetime.datetime(year, month, day, hour, minute)
-                else:
-                    match = re.search(time_pattern, msg)
-                    if match:
-                        hour, minute = map(int, match.groups())
-                        today = datetime.datetime.now()
-                        msg_time = datetime.datetime(today.year, today.month, today.day, hour, minute)
-                    else:
-                        continue
-                        
-                if latest_time is None or msg_time > latest_time:
-                    latest_time = msg_time
-            except:
-                continue
-                
+        parsed = classify_timestamp(msg)
+        if parsed and (latest_time is None or parsed.time > latest_time):
+            latest_time = parsed.time
     return latest_time
 
 def is_in_time_range(text, start_time):
     """检查消息是否在时间范围内"""
-    try:
-        # 尝试从消息文本中提取日期
-        date_pattern = r'(\d{4})年(\d{1,2})月(\d{1,2})日 (\d{1,2}):(\d{2})'
-        time_pattern = r'(\d{1,2}):(\d{2})'
-        
-        # 尝试匹配完整日期
-        match = re.search(date_pattern, text)
-        if match:
-            year, month, day, hour, minute = map(int, match.groups())
-            message_time = datetime.datetime(year, month, day, hour, minute)
-            return start_time <= message_time
-            
-        # 尝试匹配时间（假设是今天的消息）
-        match = re.search(time_pattern, text)
-        if match:
-            hour, minute = map(int, match.groups())
-            today = datetime.datetime.now()
-            message_time = datetime.datetime(today.year, today.month, today.day, hour, minute)
-            return start_time <= message_time
-            
-        return False
-    except:
-        return False
-
-def extract_text_content(element, messages=None):
-    """递归提取元素中的文本内容"""
+    parsed = classify_timestamp(text)
+    return parsed is not None and start_time <= parsed.time
+
+def iter_text_content(element, backend=None):
+    """遍历元素树，逐条产出非空文本"""
+    walker = TreeWalker(backend, max_depth=config.TREE_MAX_DEPTH or None)
+    return walker.iter_texts(element)
+
+def iter_raw_items(chat_list, backend=None, stats=None):
+    """一次遍历消息列表，为每个 ListItem 产出 (序号, 自身文本, 子孙元素的 (控件类型, 文本) 列表)"""
+    walker = TreeWalker(backend, max_depth=config.TREE_MAX_DEPTH or None)
+    index = -1
+    item_text = None
+    parts = []
+    for depth, element in walker.walk(chat_list):
+        if depth == 0:
+            continue
+        backend = walker.backend
+        try:
+            text = backend.window_text(element)
+            if depth == 1:
+                # 新的 ListItem 开始，先输出上一个
+                if index >= 0:
+                    yield index, item_text, parts
+                index += 1
+                item_text = text
+                parts = []
+            elif text and text.strip():
+                parts.append((backend.control_type(element), text))
+        except Exception as e:
+            logging.error(f"Error extracting message: {str(e)}")
+    if index >= 0:
+        yield index, item_text, parts
+    if stats is not None:
+        stats.count("list_items", index + 1)
+        stats.count("uia_calls", walker.backend.calls)
+
+def iter_messages(chat_list, backend=None, pool=None, stats=None, capture=None):
+    """一次遍历消息列表，为每个 ListItem 构造一条 Message 记录；提供进程池时并行构造
+
+    提供 capture 时，原始 ListItem 同时写入采集文件，之后可以离线重新处理。
+    """
+    raw_items = iter_raw_items(chat_list, backend, stats)
+    if stats is not None:
+        raw_items = stats.timed("extract", raw_items)
+    if capture is not None:
+        raw_items = capture.tee(raw_items)
+    messages = pool.map_messages(raw_items) if pool is not None else build_messages(raw_items)
+    if stats is not None:
+        messages = stats.timed("parse", messages)
+    return messages
+
+def render_lines(messages):
+    """把 Message 记录流展开为文本行"""
+    for message in messages:
+        yield from message.lines()
+
+def extract_text_content(element, messages=None, backend=None):
+    """提取元素中的文本内容"""
     if messages is None:
         messages = []
-    
-    try:
-        # 获取窗口文本
-        text = element.window_text()
-        if text and text.strip():  # 只保存非空文本
-            messages.append(text)
-            
-        # 递归处理子元素
-        children = element.children()
-        for child in children:
-            extract_text_content(child, messages)
-    except Exception as e:
-        logging.error(f"Error extracting text content: {str(e)}")
-    
+    messages.extend(iter_text_content(element, backend))
     return messages
 
-def is_timestamp(text):
-    """检查文本是否是时间戳"""
-    # 匹配完整日期时间格式：2025年4月10日 20:44
-    full_pattern = r'\d{4}年\d{1,2}月\d{1,2}日 \d{1,2}:\d{2}'
-    # 匹配只有时间格式：20:44
-    time_pattern = r'^\d{1,2}:\d{2}$'
-    # 匹配昨天格式：昨天 20:44
-    yesterday_pattern = r'^昨天 \d{1,2}:\d{2}$'
-    
-    return bool(re.match(full_pattern, text) or 
-                re.match(time_pattern, text) or 
-                re.match(yesterday_pattern, text))
-
-def is_system_message(text):
-    """检查是否是系统消息"""
-    system_messages = ["消息", "查看更多消息", "[图片]", "撤回了一条消息"]
-    return any(msg in text for msg in system_messages)
+def new_deduplicator():
+    """按配置创建文本去重器：只与最近 DEDUP_WINDOW（或 DEDUP_MAX_ENTRIES）行比对，都不设置时比对全部历史"""
+    return MessageDeduplicator(max_entries=config.DEDUP_MAX_ENTRIES or None, window=config.DEDUP_WINDOW or None)
 
 def remove_duplicates(messages):
     """去除重复的消息，但保留必要的发言者信息"""
-    unique_messages = []
-    last_timestamp = None
-    last_sender = None
-    
-    for msg in messages:
-        # 跳过空消息
-        if not msg.strip():
-            continue
-            
-        # 处理时间戳
-        if is_timestamp(msg):
-            last_timestamp = msg
-            unique_messages.append(msg)
-            continue
-            
-        # 处理系统消息
-        if is_system_message(msg):
-            unique_messages.append(msg)
-            continue
-            
-        # 处理发言者名称
-        # 如果当前消息不是时间戳也不是系统消息，且与上一条消息不同，则认为是新的发言者
-        if msg != last_sender and not is_timestamp(msg) and not is_system_message(msg):
-            last_sender = msg
-            unique_messages.append(msg)
-            continue
-            
-        # 处理消息内容
-        # 如果当前消息与上一条消息相同，且不是时间戳、系统消息或发言者名称，则跳过
-        if msg in unique_messages and not is_timestamp(msg) and not is_system_message(msg):
-            continue
-            
-        unique_messages.append(msg)
-    
-    return unique_messages
+    deduplicator = new_deduplicator()
+    return list(deduplicator.dedupe(messages))
 
 def parse_message_time(msg):
     """解析消息中的时间"""
-    try:
-        # 尝试解析中文日期时间格式：2025年4月10日 20:44
-        full_pattern = r'(\d{4})年(\d{1,2})月(\d{1,2})日 (\d{1,2}):(\d{2})'
-        time_pattern = r'(\d{1,2}):(\d{2})'
-        yesterday_pattern = r'昨天 (\d{1,2}):(\d{2})'
-        
-        # 先尝试解析完整日期时间
-        match = re.search(full_pattern, msg)
-        if match:
-            year, month, day, hour, minute = map(int, match.groups())
-            msg_time = datetime.datetime(year, month, day, hour, minute)
-            print(f"Parsed full timestamp: {msg_time}")
-            return msg_time
-            
-        # 尝试解析"昨天"格式
-        match = re.search(yesterday_pattern, msg)
-        if match:
-            hour, minute = map(int, match.groups())
-            # 使用昨天的日期
-            yesterday = datetime.datetime.now() - datetime.timedelta(days=1)
-            msg_time = datetime.datetime(yesterday.year, yesterday.month, yesterday.day, hour, minute)
-            print(f"Parsed yesterday timestamp: {msg_time}")
-            return msg_time
-            
-        # 如果完整日期时间和"昨天"格式都解析失败，尝试解析只有时间的情况
-        match = re.search(time_pattern, msg)
-        if match:
-            hour, minute = map(int, match.groups())
-            # 使用当前日期
-            today = datetime.datetime.now()
-            msg_time = datetime.datetime(today.year, today.month, today.day, hour, minute)
-            print(f"Parsed time-only: {msg_time}")
-            return msg_time
-            
-        return None
-    except Exception as e:
-        logging.error(f"Error parsing message time: {str(e)}")
+    parsed = classify_timestamp(msg)
+    if parsed is None:
         return None
+    if logging.getLogger().isEnabledFor(TRACE):
+        logging.log(TRACE, f"Parsed {parsed.kind} timestamp: {parsed.time}")
+    return parsed.time
 
 def find_target_time_point(chat_list):
     """查找目标时间点"""
@@ -226,185 +131,473 @@ def find_target_time_point(chat_list):
         end_time = datetime.datetime.strptime(config.END_TIME, "%Y-%m-%d %H:%M:%S")
         logging.info(f"Configured end time: {end_time}")
     
-    # 获取当前可见的消息
-    messages = extract_text_content(chat_list)
-    print("\nAll visible messages:")
+    # 获取当前可见的消息（找到目标时间点后即停止遍历）
+    # 逐条跟踪只在日志级别为 TRACE 时进行，关闭时不格式化任何字符串
+    trace = logging.getLogger().isEnabledFor(TRACE)
+    messages = iter_text_content(chat_list)
     for msg in messages:
-        print(f"Message: '{msg}'")
-        if is_timestamp(msg):
-            print(f"  This is a timestamp!")
-            msg_time = parse_message_time(msg)
-            if msg_time:
-                print(f"  Parsed time: {msg_time}")
-                # 检查是否找到目标时间点
-                if msg_time <= target_time:
-                    print(f"Found message before target time: {msg_time}")
-                    logging.info(f"Found message before target time: {msg_time}")
-                    return msg_time
-                else:
-                    print(f"Message time {msg_time} is not before target time {target_time}")
-            else:
-                print(f"  Failed to parse time from: {msg}")
-        else:
-            print(f"  Not a timestamp")
+        if trace:
+            logging.log(TRACE, f"Message: '{msg}'")
+        parsed = classify_timestamp(msg)
+        if parsed:
+            msg_time = parsed.time
+            if trace:
+                logging.log(TRACE, f"  Parsed {parsed.kind} timestamp: {msg_time}")
+            # 检查是否找到目标时间点
+            if msg_time <= target_time:
+                print(f"Found message before target time: {msg_time}")
+                logging.info(f"Found message before target time: {msg_time}")
+                return msg_time
+            elif trace:
+                logging.log(TRACE, f"Message time {msg_time} is not before target time {target_time}")
+        elif trace:
+            logging.log(TRACE, "  Not a timestamp")
     
     print("\nNo messages found before target time in visible area")
     return None
 
-def collect_messages_after_time(chat_list, target_time):
+def parse_config_time(value):
+    """解析配置中的时间，未设置时返回 None"""
+    if not value:
+        return None
+    return datetime.datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+
+def filter_messages_by_time(messages, start_time, end_time=None):
+    """按时间范围过滤 Message 记录流，按时间段整体保留或丢弃"""
+    return TimeRange(start_time, end_time).filter(messages)
+
+def collect_messages_after_time(chat_list, target_time, backend=None):
     """收集指定时间之后的所有消息"""
-    # 获取当前可见的消息
-    messages = extract_text_content(chat_list)
-    
-    # 过滤消息，只保留目标时间之后的
-    filtered_messages = []
-    for msg in messages:
-        if is_timestamp(msg):
-            msg_time = parse_message_time(msg)
-            if msg_time:
-                # 如果设置了结束时间，检查消息是否在时间范围内
-                if config.END_TIME:
-                    end_time = datetime.datetime.strptime(config.END_TIME, "%Y-%m-%d %H:%M:%S")
-                    if target_time <= msg_time <= end_time:
-                        filtered_messages.append(msg)
-                else:
-                    # 如果没有设置结束时间，只检查是否在开始时间之后
-                    if msg_time >= target_time:
-                        filtered_messages.append(msg)
-        else:
-            filtered_messages.append(msg)
-            
-    return filtered_messages
+    end_time = parse_config_time(config.END_TIME)
+    return list(render_lines(filter_messages_by_time(iter_messages(chat_list, backend), target_time, end_time)))
 
-def export_wechat_messages():
-    try:
-        logging.info("Connecting to WeChat window...")
-        # 使用 UIA 自动化接口连接到微信窗口
-        app = Application(backend="uia").connect(class_name=config.WECHAT_WINDOW_CLASS)
-        
-        # 获取主窗口
-        wechat_window = app.window(class_name=config.WECHAT_WINDOW_CLASS)
-        
-        if not wechat_window.exists():
-            raise Exception("WeChat main window not found")
-        
-        logging.info("Activating WeChat window...")
-        # 激活微信窗口
-        wechat_window.set_focus()
-        time.sleep(2)
-        
-        logging.info("Opening search box...")
-        # 使用快捷键 Ctrl+F 打开搜索框
-        send_keys('^f')
-        time.sleep(2)
-        
-        logging.info(f"Searching for group: {config.TARGET_GROUP}")
-        # 输入群聊名称并搜索
-        send_keys(config.TARGET_GROUP)
-        time.sleep(2)
-        send_keys('{ENTER}')
-        time.sleep(3)
-        
-        logging.info("Getting chat messages...")
-        # 尝试定位消息列表控件
-        chat_list = None
-        
-        # 首先尝试通过标题定位
-        try:
-            chat_list = wechat_window.child_window(title="消息", control_type="List")
-            if chat_list.exists():
-                logging.info("Found chat list by title")
-        except:
-            pass
-            
-        # 如果没找到，尝试其他方法
-        if not chat_list:
-            # 获取所有 List 控件
-            lists = wechat_window.children(control_type="List")
-            if lists:
-                # 选择第一个可见的 List 控件
-                for lst in lists:
-                    if lst.is_visible():
-                        chat_list = lst
-                        logging.info("Found chat list by visibility")
-                        break
+def tee_to_stores(stack, group, messages):
+    """按配置把消息流同时写入存档和 SQLite 消息库"""
+    archive = stack.enter_context(ArchiveWriter(config.EXPORT_PATH, group, config.ARCHIVE_FORMATS))
+    messages = archive.tee(messages)
+    if config.SQLITE_STORE:
+        from message_store import MessageStore
+        store = stack.enter_context(MessageStore(config.SQLITE_PATH))
+        messages = store.tee(messages, group, batch_size=config.SQLITE_BATCH_SIZE)
+    return messages
+
+def backfill_to_start_time(session, chat_list):
+    """把消息列表向上加载到配置的开始时间，加载到时返回该时间，否则返回 None
+
+    大步加载可能多加载几页更早的消息，这些消息由导出时的时间范围筛选掉。
+    """
+    target_time = parse_config_time(config.START_TIME) or datetime.datetime.now()
+    from backfill import Backfill
+    print(f"Backfilling chat history to {target_time}...")
+    with session.stats.phase("backfill"):
+        found = Backfill(session, chat_list).scroll_to(target_time)
+    return target_time if found else None
+
+class GroupExport:
+    """单个群聊的一次导出，分为界面准备、采集、筛选、写入和收尾几个步骤
+
+    同步导出按顺序执行这些步骤；异步导出在界面线程中执行准备和采集，筛选和写入作为后台阶段运行。
+    """
+
+    def __init__(self, group, incremental=False, backfill=False):
+        self.group = group
+        self.incremental = incremental
+        self.backfill = backfill
+        self.now = datetime.datetime.now()
+        self.target_time = None
+        self.checkpoint = None
+        self.incremental_filter = None
+        self.writer = None
+        self.filepath = None
+        self.index = None
+        self.capture = None
+
+    def prepare(self, session):
+        """打开群聊并定位消息列表；全量导出时找到目标时间点，必要时先回填。返回消息列表控件"""
+        session.open_chat(self.group)
+        chat_list = session.locate_chat_list()
+        os.makedirs(config.EXPORT_PATH, exist_ok=True)
+        if config.EXPORT_INDEX:
+            self.index = ExportIndex(config.EXPORT_PATH, self.group)
+        if config.RAW_CAPTURE:
+            self.capture = RawCapture(capture_path(config.EXPORT_PATH, self.group, self.now.strftime('%Y%m%d_%H%M%S')),
+                                      self.group)
         
-        if not chat_list:
-            raise Exception("Could not find chat message list")
-            
-        # 确保消息列表获得焦点
-        try:
-            chat_list.set_focus()
-            time.sleep(1)
-        except Exception as e:
-            logging.error(f"Error setting focus to chat list: {str(e)}")
+        if self.incremental:
+            self.checkpoint = load_checkpoint(config.EXPORT_PATH, self.group)
+            if self.checkpoint and self.checkpoint.last_time:
+                logging.info(f"Resuming group '{self.group}' from checkpoint {self.checkpoint.last_time}")
+            else:
+                logging.info(f"No checkpoint for group '{self.group}', exporting all visible messages")
+                self.target_time = parse_config_time(config.START_TIME)
+            self.incremental_filter = IncrementalFilter(self.checkpoint, self.group, config.CHECKPOINT_TAIL_SIZE)
+            self.writer = DailyMarkdownWriter(config.EXPORT_PATH, self.group, self.now.date(),
+                                              flush_every=config.EXPORT_FLUSH_EVERY)
+            return chat_list
         
         # 查找目标时间点
-        target_time = find_target_time_point(chat_list)
-        if target_time is None:
+        stats = session.stats
+        with stats.phase("find_target"):
+            self.target_time = find_target_time_point(chat_list)
+        if self.target_time is None and self.backfill:
+            # 回填已确认开始时间加载进来，不必再遍历整个列表
+            self.target_time = backfill_to_start_time(session, chat_list)
+        if self.target_time is None:
             raise Exception("Could not find target time point")
-            
-        # 收集目标时间之后的消息
-        messages = collect_messages_after_time(chat_list, target_time)
-        
-        # 生成文件名（使用当前日期和时间）
-        now = datetime.datetime.now()
-        filename = f"{config.TARGET_GROUP}_messages_{now.strftime('%Y-%m-%d_%H-%M')}.md"
-        filepath = os.path.join(config.EXPORT_PATH, filename)
         
-        # 确保目录存在
-        os.makedirs(config.EXPORT_PATH, exist_ok=True)
+        # 生成文件名（使用当前日期和时间）；写入时独占新建，同名时加序号，不覆盖以前的导出
+        filename = f"{self.group}_messages_{self.now.strftime('%Y-%m-%d_%H-%M-%S')}.md"
+        self.filepath = os.path.join(config.EXPORT_PATH, filename)
         os.makedirs(config.LOG_PATH, exist_ok=True)
+        self.writer = MarkdownExportWriter(self.filepath, self.group, self.now,
+                                           start_time=config.START_TIME, end_time=config.END_TIME,
+                                           flush_every=config.EXPORT_FLUSH_EVERY)
+        return chat_list
+
+    def raw_items(self, chat_list, stats):
+        """采集消息列表中的原始 ListItem（访问界面，须在界面线程中消费）"""
+        raw_items = stats.timed("extract", iter_raw_items(chat_list, stats=stats))
+        return self.capture.tee(raw_items) if self.capture is not None else raw_items
+
+    def select(self, messages, stats):
+        """时间过滤（增量导出为检查点过滤），再跳过以前已经导出过的消息
+
+        每个 ListItem 只遍历一次，本次采集的记录不会重复，不需要再去重。
+        """
+        if self.incremental:
+            if self.target_time:
+                messages = stats.timed("filter", filter_messages_by_time(messages, self.target_time))
+            messages = stats.timed("checkpoint_filter", self.incremental_filter.filter(messages))
+        else:
+            # target_time 是开始时间之前最早加载的时间戳，只说明开始时间已经加载，筛选按配置的时间范围
+            messages = stats.timed("filter", filter_messages_by_time(messages, parse_config_time(config.START_TIME),
+                                                                     parse_config_time(config.END_TIME)))
+        if self.index is not None:
+            messages = stats.timed("index", self.index.filter(messages))
+        return messages
+
+    def write(self, messages, stats):
+        """写入存档和消息库，再逐条写入 Markdown，返回写入条数"""
+        with ExitStack() as stack:
+            messages = stats.timed("store", tee_to_stores(stack, self.group, messages))
+            stack.enter_context(self.writer)
+            with stats.phase("write"):
+                self.writer.write_all(messages)
+        return self.writer.count
+
+    def finish(self, stats):
+        """记录计数，保存导出索引，增量导出时保存新的检查点，返回写入条数"""
+        stats.count("messages_written", self.writer.count)
+        if self.index is not None:
+            self.index.save()
+            stats.count("already_exported", self.index.skipped)
+            logging.info(f"Skipped {self.index.skipped} messages already exported for group '{self.group}' "
+                         f"(index holds {len(self.index)})")
+        if self.incremental:
+            save_checkpoint(config.EXPORT_PATH, self.incremental_filter.next_checkpoint())
+            logging.info(f"Incrementally exported {self.writer.count} new messages "
+                         f"({self.incremental_filter.skipped} already exported) "
+                         f"to {', '.join(self.writer.files) or 'no file'}")
+        elif self.writer.count:
+            self.filepath = self.writer.filepath
+            logging.info(f"Successfully exported {self.writer.count} messages to {self.filepath}")
+        else:
+            self.filepath = None
+            logging.info(f"No new messages for group '{self.group}', no export file written")
+        if self.capture is not None:
+            self.close()
+            logging.info(f"Saved {self.capture.count} raw items to {self.capture.path}")
+        return self.writer.count
+
+    def close(self):
+        """关闭采集文件（导出失败时也要调用）"""
+        if self.capture is not None:
+            self.capture.close()
+
+def export_group(session, group, incremental=False, backfill=False, pool=None):
+    """在已连接的会话中导出单个群聊，返回导出的消息条数"""
+    export = GroupExport(group, incremental, backfill)
+    try:
+        chat_list = export.prepare(session)
         
-        # 去除重复消息
-        unique_messages = remove_duplicates(messages)
+        # 流水线：提取 Message 记录 → 时间过滤（或检查点过滤）→ 跳过已导出的消息 → 写入存档和消息库 → 逐条写入
+        stats = session.stats
+        with stats.phase("export"):
+            messages = export.select(iter_messages(chat_list, pool=pool, stats=stats, capture=export.capture), stats)
+            export.write(messages, stats)
+        return export.finish(stats)
+    finally:
+        export.close()
+
+def reprocess_capture(path, output_dir, start_time=None, end_time=None):
+    """离线重新处理一个采集文件：构造消息 → 时间过滤 → 写入 Markdown，返回 (输出文件, 写入条数)
+
+    相对时间戳按采集时间解析。逐条流式处理，内存占用与采集文件大小无关。
+    """
+    header = read_header(path)
+    group = header.get("group", "")
+    captured_at = header.get("captured_at")
+    captured_at = datetime.datetime.strptime(captured_at, "%Y-%m-%d %H:%M:%S") if captured_at else None
+    run = os.path.basename(path)[:-len(".jsonl.gz")]
+    filepath = os.path.join(output_dir, f"{run}_reprocessed.md")
+    os.makedirs(output_dir, exist_ok=True)
+    
+    messages = filter_messages_by_time(build_messages(iter_capture(path), now=captured_at),
+                                       parse_config_time(start_time), parse_config_time(end_time))
+    # 重新处理的输出按采集文件命名，重复处理时覆盖上一次的结果
+    with MarkdownExportWriter(filepath, group, captured_at or datetime.datetime.now(), start_time=start_time, end_time=end_time,
+                              flush_every=config.EXPORT_FLUSH_EVERY, overwrite=True) as writer:
+        writer.write_all(messages)
+    return filepath, writer.count
+
+def reprocess_one(path, output_dir, start_time=None, end_time=None):
+    """重新处理一个采集文件，异常作为结果返回：(采集文件, 输出文件, 条数, 错误)"""
+    try:
+        filepath, count = reprocess_capture(path, output_dir, start_time, end_time)
+        return path, filepath, count, None
+    except Exception as e:
+        return path, None, 0, str(e)
+
+def report_group_timings(timings):
+    """输出每个群聊的导出耗时"""
+    print("\nPer-group export timing:")
+    for group, elapsed, count, error in timings:
+        status = f"{count} messages" if error is None else f"FAILED: {error}"
+        print(f"  {group}: {elapsed:.2f}s, {status}")
+    total = sum(elapsed for _, elapsed, _, _ in timings)
+    print(f"  total: {total:.2f}s for {len(timings)} groups")
+
+def open_worker_pool(stack):
+    """配置了多个工作进程时创建进程池，消息解析与界面遍历并行"""
+    if config.POSTPROCESS_WORKERS <= 1:
+        return None
+    return stack.enter_context(WorkerPool(config.POSTPROCESS_WORKERS,
+                                          batch_size=config.POSTPROCESS_BATCH_SIZE,
+                                          max_pending=config.POSTPROCESS_MAX_PENDING or None))
+
+def export_groups(session, groups, incremental=False, backfill=False, pool=None):
+    """连接微信窗口后依次导出每个群聊，返回每个群聊的 (群名, 耗时, 条数, 错误)"""
+    session.connect()
+    timings = []
+    for group in groups:
+        start = time.perf_counter()
+        try:
+            count = export_group(session, group, incremental=incremental, backfill=backfill, pool=pool)
+            timings.append((group, time.perf_counter() - start, count, None))
+        except Exception as e:
+            logging.error(f"Error exporting group '{group}': {str(e)}")
+            timings.append((group, time.perf_counter() - start, 0, str(e)))
+    return timings
+
+def export_groups_async(session, groups, incremental=False, backfill=False, pool=None):
+    """界面操作在专用线程中进行，解析、筛选和写入作为异步阶段与界面并行"""
+    from async_export import AsyncExporter
+    exporter = AsyncExporter(session, lambda group: GroupExport(group, incremental, backfill), pool=pool,
+                             batch_size=config.ASYNC_BATCH_SIZE, queue_size=config.ASYNC_QUEUE_SIZE)
+    return exporter.export(groups)
+
+def export_wechat_messages(incremental=False, groups=None, backfill=False, profile=False, trace_memory=False,
+                           async_export=False):
+    """连接一次微信窗口，依次导出所有群聊，结束后写入本次运行的 JSON 统计"""
+    groups = groups or config.TARGET_GROUPS
+    run_id = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+    profile_path = os.path.join(config.LOG_PATH, f"profile_{run_id}.prof") if profile else None
+    from wechat_session import WeChatSession
+    try:
+        session = WeChatSession()
         
-        # 将消息写入文件
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(f"# {config.TARGET_GROUP} 聊天记录 - {now.strftime('%Y-%m-%d %H:%M')}\n\n")
-            if config.START_TIME:
-                f.write(f"开始时间: {config.START_TIME}\n")
-            if config.END_TIME:
-                f.write(f"结束时间: {config.END_TIME}\n")
-            f.write(f"导出时间: {now}\n\n")
-            for message in unique_messages:
-                f.write(f"{message}\n\n")
+        with profiling(profile_path, trace_memory, session.stats), ExitStack() as stack:
+            pool = open_worker_pool(stack)
+            export = export_groups_async if async_export else export_groups
+            timings = export(session, groups, incremental=incremental, backfill=backfill, pool=pool)
         
-        logging.info(f"Successfully exported {len(unique_messages)} messages to {filepath}")
+        report_group_timings(timings)
+        session.stats.log_summary()
+        write_run_summary(os.path.join(config.LOG_PATH, f"run_{run_id}.json"), session.stats,
+                          run_id=run_id, incremental=incremental,
+                          groups=[{"group": group, "seconds": round(elapsed, 3), "count": count, "error": error}
+                                  for group, elapsed, count, error in timings])
+        failed = [group for group, _, _, error in timings if error is not None]
+        if failed:
+            raise Exception(f"{len(failed)} of {len(groups)} groups failed: {', '.join(failed)}")
         
     except Exception as e:
         error_msg = f"Error occurred: {str(e)}"
         logging.error(error_msg)
         raise
 
-def main():
+def run_daemon(incremental=False, groups=None, backfill=False, pipeline=None):
+    """常驻运行，按每个群聊的计划反复导出；每次运行结束把 pipeline 缓冲的日志写盘"""
+    from daemon import ExportDaemon, parse_group_schedules
+    from wechat_session import WeChatSession
+    groups = groups or config.TARGET_GROUPS
+    plans = parse_group_schedules(config.GROUP_SCHEDULES, groups, config.DAEMON_INTERVAL)
+    with ExitStack() as stack:
+        pool = open_worker_pool(stack)
+        
+        def export(session, group):
+            return export_group(session, group, incremental=incremental, backfill=backfill, pool=pool)
+        
+        ExportDaemon(WeChatSession(), export, plans,
+                     flush_logs=pipeline.flush if pipeline is not None else None).run_forever()
+
+def load_groups_file(path):
+    """读取群聊列表文件，每行一个群名，忽略空行和 # 注释"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
+
+def resolve_groups(args):
+    """按命令行、群聊列表文件、配置的优先级确定要导出的群聊"""
+    if args.group:
+        return args.group
+    groups_file = args.groups_file or config.GROUPS_FILE
+    if groups_file:
+        return load_groups_file(groups_file)
+    return config.TARGET_GROUPS
+
+# 子命令；命令行不以子命令开头时按 export 处理，兼容原来的用法
+COMMANDS = ("export", "structure", "query", "reprocess")
+
+def add_export_arguments(parser):
+    """注册 export 子命令的参数"""
+    parser.add_argument("--incremental", action="store_true", default=config.INCREMENTAL_EXPORT,
+                        help="only append messages newer than the group's checkpoint to daily files")
+    parser.add_argument("--group", action="append",
+                        help="group to export; repeat to export several groups in one session")
+    parser.add_argument("--groups-file", help="file listing one group name per line")
+    parser.add_argument("--backfill", action="store_true", default=config.BACKFILL,
+                        help="scroll back through the chat history until START_TIME is loaded")
+    parser.add_argument("--async", dest="async_export", action="store_true", default=config.ASYNC_EXPORT,
+                        help="run UI automation on a dedicated thread and overlap parsing and writing with it")
+    parser.add_argument("--daemon", action="store_true",
+                        help="stay resident and export each group on its schedule")
+    parser.add_argument("--profile", action="store_true", default=config.PROFILE,
+                        help="record a cProfile profile to LOG_PATH/profile_<run>.prof")
+    parser.add_argument("--trace-memory", action="store_true", default=config.TRACE_MEMORY,
+                        help="track allocations with tracemalloc and log the top allocation sites")
+
+def start_logging(run_log=None):
+    """日志和 print 输出都经队列由后台线程写到控制台和文件"""
+    from log_setup import LoggingPipeline
+    pipeline = LoggingPipeline(config.LOG_PATH, level=logging.getLevelName(config.LOG_LEVEL), run_log=run_log,
+                               max_bytes=config.LOG_MAX_BYTES, backup_count=config.LOG_BACKUP_COUNT,
+                               buffer_records=config.LOG_BUFFER_RECORDS)
+    return pipeline.start()
+
+def run_export(args):
+    groups = resolve_groups(args)
+    
     # 确保导出目录和日志目录存在
     os.makedirs(config.EXPORT_PATH, exist_ok=True)
     os.makedirs(config.LOG_PATH, exist_ok=True)
     
-    # 设置日志文件
     log_filename = f"run_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
-    log_path = os.path.join(config.LOG_PATH, log_filename)
-    logger = Logger(log_path)
-    sys.stdout = logger
+    pipeline = start_logging(os.path.join(config.LOG_PATH, log_filename))
     
     try:
         print("Starting WeChat Message Exporter...")
-        print(f"Will export messages from group '{config.TARGET_GROUP}'")
+        print(f"Will export messages from {len(groups)} group(s): {', '.join(groups)}")
         if config.START_TIME:
             print(f"Start time: {config.START_TIME}")
         if config.END_TIME:
             print(f"End time: {config.END_TIME}")
         
-        # 立即执行导出
-        export_wechat_messages()
+        if args.daemon:
+            run_daemon(incremental=args.incremental, groups=groups, backfill=args.backfill, pipeline=pipeline)
+        else:
+            # 立即执行导出
+            export_wechat_messages(incremental=args.incremental, groups=groups, backfill=args.backfill,
+                                   profile=args.profile, trace_memory=args.trace_memory,
+                                   async_export=args.async_export)
         
     except Exception as e:
         print(f"Export failed: {str(e)}")
+        return 1
     finally:
-        # 恢复标准输出并关闭日志文件
-        sys.stdout = logger.console
-        logger.close()
+        # 恢复标准输出，写完剩余日志并关闭日志文件
+        pipeline.stop()
+    return 0
+
+def run_structure(args):
+    structure = importlib.import_module("wechat_structure-scroll")
+    pipeline = start_logging()
+    try:
+        structure.export_wechat_structure(args.group)
+    except Exception as e:
+        print(f"Structure export failed: {str(e)}")
+        return 1
+    finally:
+        pipeline.stop()
+    return 0
+
+def run_reprocess(args):
+    paths = args.captures or find_captures(config.EXPORT_PATH, args.group)
+    if not paths:
+        print(f"No captures found in {os.path.join(config.EXPORT_PATH, '.captures')}")
+        return 1
+    start = time.perf_counter()
+    reprocess = functools.partial(reprocess_one, output_dir=args.output_dir, start_time=args.start,
+                                  end_time=args.end)
+    with ExitStack() as stack:
+        # 采集文件互不相关，多个文件时分给多个进程并行处理
+        if args.workers > 1 and len(paths) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=args.workers))
+            results = executor.map(reprocess, paths, chunksize=max(1, len(paths) // (args.workers * 4)))
+        else:
+            results = map(reprocess, paths)
+        
+        total, failed = 0, 0
+        for path, filepath, count, error in results:
+            if error is not None:
+                failed += 1
+                print(f"Error reprocessing {path}: {error}")
+                continue
+            total += count
+            print(f"{os.path.basename(path)}: {count} messages -> {filepath}")
+    print(f"Reprocessed {len(paths)} captures, {total} messages in {time.perf_counter() - start:.2f}s"
+          + (f", {failed} failed" if failed else ""))
+    return 1 if failed else 0
+
+def run_query(args):
+    from message_store import run_query
+    return run_query(args)
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="WeChat Message Exporter")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+    
+    export = commands.add_parser("export", help="export chat messages from the WeChat window (default)")
+    add_export_arguments(export)
+    export.set_defaults(func=run_export)
+    
+    structure = commands.add_parser("structure", help="dump the UI element structure of a chat")
+    structure.add_argument("--group", help="group to dump (default: TARGET_GROUP)")
+    structure.set_defaults(func=run_structure)
+    
+    reprocess = commands.add_parser("reprocess", help="rebuild Markdown exports from saved raw captures without WeChat")
+    reprocess.add_argument("captures", nargs="*", help="capture files (default: all in EXPORT_PATH/.captures)")
+    reprocess.add_argument("--group", action="append", help="only captures of this group; may be repeated")
+    reprocess.add_argument("--start", default=config.START_TIME, help="start time, YYYY-MM-DD HH:MM:SS")
+    reprocess.add_argument("--end", default=config.END_TIME, help="end time, YYYY-MM-DD HH:MM:SS")
+    reprocess.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                           help="processes used when reprocessing several captures")
+    reprocess.add_argument("--output-dir", default=os.path.join(config.EXPORT_PATH, "reprocessed"),
+                           help="directory for the rebuilt Markdown files")
+    reprocess.set_defaults(func=run_reprocess)
+    
+    from message_store import add_query_arguments
+    query = commands.add_parser("query", help="query the SQLite message store without WeChat")
+    add_query_arguments(query, config.SQLITE_PATH)
+    query.set_defaults(func=run_query)
+    return parser
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or (argv[0] not in COMMANDS and argv[0] not in ("-h", "--help")):
+        argv = ["export"] + argv
+    args = build_parser().parse_args(argv)
+    return args.func(args)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    sys.exit(main())
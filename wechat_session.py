@@ -0,0 +1,169 @@
+import logging
+from pywinauto.application import Application
+from pywinauto.keyboard import send_keys
+import config
+from locator_cache import STRATEGIES, LocatorCache
+from waits import PhaseStats, wait_until
+
+class WeChatSession:
+    """复用同一个微信窗口连接，依次打开多个群聊
+
+    连接和激活窗口只做一次；消息列表控件解析后缓存，切换群聊时只需确认它仍然可用，
+    定位结果还会写入磁盘，下次运行直接按缓存取回。
+    各步骤都等待真正需要的界面状态出现，而不是固定休眠。
+    """
+
+    def __init__(self, window_class=None, stats=None):
+        self.window_class = window_class or config.WECHAT_WINDOW_CLASS
+        self.stats = stats or PhaseStats()
+        self.app = None
+        self.window = None
+        self.handle = None
+        self._chat_list = None
+        self.locator_cache = LocatorCache(config.LOCATOR_CACHE_PATH) if config.LOCATOR_CACHE else None
+
+    def _wait(self, condition, description, timeout=None, raise_on_timeout=True):
+        return wait_until(condition,
+                          timeout=config.WAIT_TIMEOUT if timeout is None else timeout,
+                          interval=config.WAIT_POLL_INTERVAL,
+                          max_interval=config.WAIT_MAX_INTERVAL,
+                          description=description,
+                          stats=self.stats,
+                          raise_on_timeout=raise_on_timeout)
+
+    def connect(self):
+        """连接并激活微信主窗口"""
+        with self.stats.phase("connect"):
+            logging.info("Connecting to WeChat window...")
+            # 使用 UIA 自动化接口连接到微信窗口
+            self.app = Application(backend="uia").connect(class_name=self.window_class)
+
+            # 获取主窗口
+            self.window = self.app.window(class_name=self.window_class)
+
+            if not self.window.exists():
+                raise Exception("WeChat main window not found")
+            self.handle = self.window.handle
+            # 重新连接后旧窗口中的控件都已失效
+            self._chat_list = None
+
+            logging.info("Activating WeChat window...")
+            # 激活微信窗口，等待它成为前台窗口
+            self.window.set_focus()
+            self._wait(self.window.is_active, "WeChat window to become active", raise_on_timeout=False)
+        return self.window
+
+    def is_alive(self):
+        """连接时的窗口句柄是否仍然有效"""
+        if self.handle is None:
+            return False
+        from pywinauto import handleprops
+        return bool(handleprops.iswindow(self.handle))
+
+    def open_chat(self, group):
+        """通过搜索框打开指定群聊"""
+        with self.stats.phase("search"):
+            logging.info("Opening search box...")
+            # 使用快捷键 Ctrl+F 打开搜索框；搜索框一直存在，要等它获得键盘焦点
+            send_keys('^f')
+            search_box = self.window.child_window(title="搜索", control_type="Edit")
+            self._wait(lambda: search_box.exists(timeout=0) and search_box.has_keyboard_focus(),
+                       "search box focus")
+
+            logging.info(f"Searching for group: {group}")
+            # 输入群聊名称，等待输入生效，再等搜索结果弹出层中出现该群聊
+            send_keys(group)
+            self._wait(lambda: group in (search_box.get_value() or ""), "search text",
+                       raise_on_timeout=False)
+            self._wait(lambda: self._has_search_result(group), f"search result '{group}'")
+
+            # 回车打开群聊，等待聊天标题变为该群聊
+            send_keys('{ENTER}')
+            title = self.window.child_window(title=group, control_type="Button")
+            self._wait(lambda: title.exists(timeout=0), f"chat title '{group}'")
+
+    def _has_search_result(self, group):
+        """搜索结果中是否出现了该群聊，左侧会话列表中的同名项不算"""
+        for item in self.window.descendants(title=group, control_type="ListItem"):
+            parent = item.parent()
+            if parent is None or parent.window_text() != config.WECHAT_SESSION_LIST_TITLE:
+                return True
+        return False
+
+    def _find_chat_list(self):
+        """在主窗口中查找消息列表控件，优先使用磁盘上缓存的定位结果"""
+        cache = self.locator_cache
+        if cache is not None:
+            chat_list = cache.resolve(self.window)
+            if chat_list is not None:
+                logging.info("Found chat list from locator cache")
+                return chat_list
+
+        for strategy in (cache.strategies() if cache is not None else STRATEGIES):
+            chat_list = self._find_chat_list_by(strategy)
+            if chat_list is not None:
+                if cache is not None:
+                    cache.record(self.window, chat_list, strategy)
+                return chat_list
+        return None
+
+    def _find_chat_list_by(self, strategy):
+        """按指定策略查找消息列表控件"""
+        if strategy == "title":
+            # 通过标题定位
+            try:
+                spec = self.window.child_window(title="消息", control_type="List")
+                if spec.exists():
+                    logging.info("Found chat list by title")
+                    return spec.wrapper_object()
+            except Exception:
+                pass
+        elif strategy == "visible_list":
+            # 获取所有 List 控件，选择第一个可见的
+            for lst in self.window.children(control_type="List"):
+                if lst.is_visible():
+                    logging.info("Found chat list by visibility")
+                    return lst
+        return None
+
+    def locate_chat_list(self):
+        """返回消息列表控件，优先复用上一次解析的结果"""
+        with self.stats.phase("locate_list"):
+            chat_list = self._chat_list
+            if chat_list is not None:
+                try:
+                    if chat_list.is_visible():
+                        logging.info("Reusing resolved chat list")
+                    else:
+                        chat_list = None
+                except Exception:
+                    chat_list = None
+
+            if chat_list is None:
+                logging.info("Getting chat messages...")
+                chat_list = self._find_chat_list()
+
+            if not chat_list:
+                self._chat_list = None
+                raise Exception("Could not find chat message list")
+            self._chat_list = chat_list
+
+            # 确保消息列表获得焦点
+            try:
+                chat_list.set_focus()
+                self._wait(chat_list.has_keyboard_focus, "chat list focus",
+                           timeout=1, raise_on_timeout=False)
+            except Exception as e:
+                logging.error(f"Error setting focus to chat list: {str(e)}")
+        return chat_list
+
+    def list_item_count(self, chat_list):
+        """当前已加载的消息项数量"""
+        return len(chat_list.children(control_type="ListItem"))
+
+    def wait_for_new_items(self, chat_list, previous_count, timeout=None):
+        """等待消息列表中的消息项数量发生变化，返回新的数量"""
+        timeout = config.SCROLL_WAIT_TIME if timeout is None else timeout
+        changed = self._wait(lambda: self.list_item_count(chat_list) != previous_count,
+                             "new list items", timeout=timeout, raise_on_timeout=False)
+        return self.list_item_count(chat_list) if changed else previous_count
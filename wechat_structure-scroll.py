@@ -1,57 +1,56 @@
 import os
-import time
 import datetime
-from pywinauto.application import Application
-from pywinauto.keyboard import send_keys
-from pywinauto.mouse import scroll
+import logging
+from pywinauto.mouse import press, release, move
 import config
+from tree_walker import TreeWalker
+from item_tracker import ItemTracker
+from wechat_session import WeChatSession
+from log_setup import LoggingPipeline
+from ui_snapshot import capture_snapshot, save_snapshot
+from structure_dump import StructureDumpWriter
 
-def print_element_structure(element, level=0, output_lines=None):
-    """递归打印元素结构"""
+def print_element_structure(element, level=0, output_lines=None, backend=None):
+    """迭代打印元素结构"""
     if output_lines is None:
         output_lines = []
     
-    # 获取元素的基本信息
+    walker = TreeWalker(backend, max_depth=config.TREE_MAX_DEPTH or None)
     try:
-        # 获取元素类型
-        try:
-            control_type = element.control_type()
-        except:
-            control_type = "Unknown"
+        for depth, node in walker.walk(element):
+            backend = walker.backend
+            indent = '|    ' * (level + depth)
             
-        # 获取窗口文本
-        try:
-            window_text = element.window_text()
-        except:
-            window_text = ""
-            
-        # 获取位置信息
-        try:
-            rect = element.rectangle()
-            rect_str = f"({rect.left}, {rect.top}, {rect.right}, {rect.bottom})"
-        except:
-            rect_str = "(Unknown position)"
+            # 获取元素类型
+            try:
+                control_type = backend.control_type(node)
+            except:
+                control_type = "Unknown"
+                
+            # 获取窗口文本
+            try:
+                window_text = backend.window_text(node)
+            except:
+                window_text = ""
+                
+            # 获取位置信息
+            try:
+                left, top, right, bottom = backend.rectangle(node)
+                rect_str = f"({left}, {top}, {right}, {bottom})"
+            except:
+                rect_str = "(Unknown position)"
+                
+            # 构建元素信息
+            output_lines.append(f"{indent}{control_type} - '{window_text}'    {rect_str}")
             
-        # 构建元素信息
-        element_info = f"{'|    ' * level}{control_type} - '{window_text}'    {rect_str}"
-        output_lines.append(element_info)
-        
-        # 获取元素的类名和自动化ID
-        try:
-            class_name = element.class_name()
-            automation_id = element.automation_id()
-            if class_name or automation_id:
-                output_lines.append(f"{'|    ' * level}['{class_name}', '{automation_id}']")
-        except:
-            pass
-        
-        # 获取元素的子元素
-        try:
-            children = element.children()
-            for child in children:
-                print_element_structure(child, level + 1, output_lines)
-        except:
-            pass
+            # 获取元素的类名和自动化ID
+            try:
+                class_name = backend.class_name(node)
+                automation_id = backend.automation_id(node)
+                if class_name or automation_id:
+                    output_lines.append(f"{indent}['{class_name}', '{automation_id}']")
+            except:
+                pass
             
     except Exception as e:
         # 将错误信息写入日志文件
@@ -62,72 +61,21 @@ def print_element_structure(element, level=0, output_lines=None):
     
     return output_lines
 
-def export_wechat_structure():
+def export_wechat_structure(group=None):
+    group = group or config.TARGET_GROUP
     try:
-        print("Connecting to WeChat window...")
-        # 使用 UIA 自动化接口连接到微信窗口
-        app = Application(backend="uia").connect(class_name=config.WECHAT_WINDOW_CLASS)
-        
-        # 获取主窗口
-        wechat_window = app.window(class_name=config.WECHAT_WINDOW_CLASS)
-        
-        if not wechat_window.exists():
-            raise Exception("WeChat main window not found")
-        
-        print("Activating WeChat window...")
-        # 激活微信窗口
-        wechat_window.set_focus()
-        time.sleep(1)  # 减少等待时间
-        
-        print("Opening search box...")
-        # 使用快捷键 Ctrl+F 打开搜索框
-        send_keys('^f')
-        time.sleep(1)  # 减少等待时间
-        
-        print(f"Searching for group: {config.TARGET_GROUP}")
-        # 输入群聊名称并搜索
-        send_keys(config.TARGET_GROUP)
-        time.sleep(1)  # 减少等待时间
-        send_keys('{ENTER}')
-        time.sleep(2)  # 减少等待时间
+        # 连接微信窗口并打开目标群聊
+        session = WeChatSession()
+        session.connect()
+        session.open_chat(group)
         
         print("Getting chat structure...")
-        # 尝试定位消息列表控件
-        chat_list = None
-        
-        # 首先尝试通过标题定位
-        try:
-            chat_list = wechat_window.child_window(title="消息", control_type="List")
-            if chat_list.exists():
-                print("Found chat list by title")
-        except:
-            pass
-            
-        # 如果没找到，尝试其他方法
-        if not chat_list:
-            # 获取所有 List 控件
-            lists = wechat_window.children(control_type="List")
-            if lists:
-                # 选择第一个可见的 List 控件
-                for lst in lists:
-                    if lst.is_visible():
-                        chat_list = lst
-                        print("Found chat list by visibility")
-                        break
-        
-        if not chat_list:
-            raise Exception("Could not find chat message list")
-            
-        # 确保消息列表获得焦点
-        try:
-            chat_list.set_focus()
-            time.sleep(0.5)  # 减少等待时间
-        except Exception as e:
-            print(f"Error setting focus to chat list: {str(e)}")
+        chat_list = session.locate_chat_list()
             
         # 生成文件名（使用当前日期）
         today = datetime.datetime.now().strftime("%Y-%m-%d")
-        filename = f"{config.TARGET_GROUP}_structure_{today}.md"
+        extension = "ndjson.gz" if config.STRUCTURE_FORMAT == "ndjson" else "md"
+        filename = f"{group}_structure_{today}.{extension}"
         filepath = os.path.join(config.EXPORT_PATH, filename)
         
         # 确保目录存在
@@ -139,8 +87,17 @@ def export_wechat_structure():
         print(f"Maximum scroll attempts: {config.MAX_SCROLL_ATTEMPTS}")
         print(f"Scroll wait time: {config.SCROLL_WAIT_TIME} seconds")
         
-        # 用于存储所有结构信息
-        all_structure_lines = []
+        # 结构信息逐条写入文件，不在内存中累积
+        if config.STRUCTURE_FORMAT == "ndjson":
+            dump = StructureDumpWriter(filepath, max_depth=config.TREE_MAX_DEPTH or None)
+            structure_file = None
+        else:
+            dump = None
+            structure_file = open(filepath, 'w', encoding='utf-8')
+        written = 0
+        
+        # 增量捕获：按 ListItem 的稳定标识跳过已经捕获过的消息
+        tracker = ItemTracker() if config.INCREMENTAL_CAPTURE else None
         
         # 循环滚动和捕获结构
         scroll_count = 0
@@ -157,16 +114,14 @@ def export_wechat_structure():
                 scrollbar_top = rect.top + 50  # 从顶部开始
                 scrollbar_bottom = rect.bottom - 50  # 到底部结束
                 
+                # 记录滚动前已加载的消息项数量
+                item_count = session.list_item_count(chat_list)
+                
                 # 使用鼠标模拟拖动滚动条
-                from pywinauto.mouse import press, release, move
                 try:
-                    # 移动到滚动条顶部
+                    # 移动到滚动条顶部并按下鼠标左键
                     move(coords=(scrollbar_x, scrollbar_top))
-                    time.sleep(0.2)  # 减少等待时间
-                    
-                    # 按下鼠标左键
                     press(coords=(scrollbar_x, scrollbar_top))
-                    time.sleep(0.2)  # 减少等待时间
                     
                     # 开始缓慢拖动到滚动条底部
                     current_y = scrollbar_top
@@ -177,9 +132,8 @@ def export_wechat_structure():
                         # 移动一小步
                         current_y += step
                         move(coords=(scrollbar_x, current_y))
-                        time.sleep(0.05)  # 减少等待时间
                         
-                        # 检查是否到达顶部
+                        # 检查是否到达顶部（查询本身就给了界面刷新的时间）
                         try:
                             # 获取消息列表中的第一个消息项
                             first_message = chat_list.children(control_type="ListItem")[0]
@@ -195,10 +149,11 @@ def export_wechat_structure():
                     # 如果还没有到达顶部，继续拖动到底部
                     if not reached_top:
                         move(coords=(scrollbar_x, scrollbar_bottom))
-                        time.sleep(0.2)  # 减少等待时间
                         release(coords=(scrollbar_x, scrollbar_bottom))
                     
-                    time.sleep(config.SCROLL_WAIT_TIME)
+                    # 等待新的消息项加载
+                    with session.stats.phase("scroll"):
+                        item_count = session.wait_for_new_items(chat_list, item_count)
                 except Exception as e:
                     print(f"Error in mouse drag: {str(e)}")
                 
@@ -223,28 +178,38 @@ def export_wechat_structure():
                         button_x = (button_rect.left + button_rect.right) // 2
                         button_y = (button_rect.top + button_rect.bottom) // 2
                         
-                        # 移动到按钮位置并点击
+                        # 移动到按钮位置并点击，等待新的消息项加载
                         move(coords=(button_x, button_y))
-                        time.sleep(0.2)  # 减少等待时间
                         press(coords=(button_x, button_y))
-                        time.sleep(0.1)
                         release(coords=(button_x, button_y))
-                        time.sleep(config.SCROLL_WAIT_TIME)
+                        with session.stats.phase("scroll"):
+                            item_count = session.wait_for_new_items(chat_list, item_count)
                     except Exception as e:
                         print(f"Error clicking button: {str(e)}")
                 
-                # 获取所有已加载的消息结构
-                print("Capturing structure of all loaded messages...")
+                # 获取已加载的消息结构
+                print("Capturing structure of loaded messages...")
                 try:
-                    # 获取所有消息项
+                    # 获取所有消息项，增量模式下只保留之前没有捕获过的
                     messages = chat_list.children(control_type="ListItem")
-                    print(f"Found {len(messages)} messages")
+                    loaded = len(messages)
+                    if tracker is not None:
+                        messages = tracker.new_items(messages)
+                        print(f"Found {loaded} messages, {len(messages)} new")
+                    else:
+                        print(f"Found {loaded} messages")
                     
                     # 为每个消息获取结构
                     for msg in messages:
                         try:
-                            msg_structure = print_element_structure(msg)
-                            all_structure_lines.extend(msg_structure)
+                            if dump is not None:
+                                written += dump.write_tree(msg)
+                            else:
+                                msg_structure = print_element_structure(msg)
+                                if msg_structure:
+                                    # 与原来整体 join 的输出保持一致：行之间换行，末尾没有换行
+                                    structure_file.write(("\n" if written else "") + '\n'.join(msg_structure))
+                                    written += len(msg_structure)
                         except Exception as e:
                             print(f"Error getting message structure: {str(e)}")
                 except Exception as e:
@@ -256,12 +221,23 @@ def export_wechat_structure():
                 print(f"Error in main loop: {str(e)}")
                 break
         
-        # 将结构写入文件
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(all_structure_lines))
+        # 关闭结构文件
+        if dump is not None:
+            dump.close()
+        else:
+            structure_file.close()
         
         print(f"Successfully exported chat structure to {filepath}")
         
+        # 保存整个消息列表的快照，可离线回放导出流程
+        if config.STRUCTURE_SNAPSHOT:
+            snapshot_path = os.path.join(config.EXPORT_PATH, f"{group}_snapshot_{today}.json.gz")
+            save_snapshot(capture_snapshot(chat_list), snapshot_path)
+            print(f"Saved chat list snapshot to {snapshot_path}")
+        if tracker is not None:
+            print(f"Captured {tracker.total} unique messages, per scroll: {tracker.captured_per_scroll}")
+        session.stats.log_summary()
+        
     except Exception as e:
         error_msg = f"Error occurred: {str(e)}"
         print(error_msg)
@@ -273,4 +249,7 @@ def export_wechat_structure():
         raise
 
 if __name__ == "__main__":
-    export_wechat_structure() 
\ No newline at end of file
+    with LoggingPipeline(config.LOG_PATH, level=logging.getLevelName(config.LOG_LEVEL),
+                         max_bytes=config.LOG_MAX_BYTES, backup_count=config.LOG_BACKUP_COUNT,
+                         buffer_records=config.LOG_BUFFER_RECORDS):
+        export_wechat_structure()
@@ -0,0 +1,79 @@
+import logging
+from collections import deque
+from message_types import TIMESTAMP, MessageBuilder
+
+def build_messages(raw_items, now=None):
+    """把原始 ListItem (序号, 自身文本, 子孙元素的 (控件类型, 文本) 列表) 逐条构造成 Message
+
+    now 是解析相对时间戳（“昨天”、星期、只有时刻）的参照时间，默认为当前时间。
+    """
+    builder = MessageBuilder(now)
+    for index, item_text, parts in raw_items:
+        message = builder.build(index, item_text, parts)
+        if message:
+            yield message
+
+def build_batch(batch):
+    """工作进程入口：构造一批消息（批内第一个时间戳之前的消息时间为 None，由主进程补齐）"""
+    return list(build_messages(batch))
+
+def iter_batches(items, batch_size):
+    """把流按固定大小切成列表"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+class WorkerPool:
+    """用进程池并行解析和分类采集到的原始消息
+
+    主线程继续遍历界面时，已采集的批次在工作进程中构造 Message；
+    提交的批次按顺序排在队列中，最多同时挂起 max_pending 批，结果严格按提交顺序产出。
+    时间段跨批次延续，由主进程用上一批最后的时间补齐。
+    """
+
+    def __init__(self, workers, batch_size=500, max_pending=None):
+        self.workers = workers
+        self.batch_size = max(1, batch_size)
+        self.max_pending = max_pending or workers * 2
+        self.batches = 0
+        # 只有启用进程池时才导入 multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        self._executor = ProcessPoolExecutor(max_workers=workers)
+
+    def map_messages(self, raw_items):
+        """按原始顺序产出 Message 流"""
+        pending = deque()
+        current_time = None
+        for batch in iter_batches(raw_items, self.batch_size):
+            pending.append(self._executor.submit(build_batch, batch))
+            self.batches += 1
+            # 队列满时先取出最早的批次，界面采集随之暂停
+            while len(pending) >= self.max_pending:
+                current_time = yield from self._drain(pending.popleft(), current_time)
+        while pending:
+            current_time = yield from self._drain(pending.popleft(), current_time)
+
+    def _drain(self, future, current_time):
+        for message in future.result():
+            if message.kind == TIMESTAMP:
+                current_time = message.timestamp
+            elif message.timestamp is None:
+                message.timestamp = current_time
+            yield message
+        return current_time
+
+    def close(self):
+        logging.debug(f"Worker pool processed {self.batches} batches")
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False